@@ -1,16 +1,100 @@
 """AutoDeskCleaner - Automated Desktop File Organizer"""
+import time
+
+_START_TIME = time.perf_counter()
+
 import sys
 import argparse
 from pathlib import Path
 
-# Add src/backend to path
-sys.path.insert(0, str(Path(__file__).parent / "src" / "backend"))
+# Backend components are loaded lazily on first use
+from src import backend
+
+# Cold start budget for a small run, in milliseconds
+STARTUP_TARGET_MS = 100.0
 
-from config_manager import ConfigManager
-from scanner import Scanner
-from categorizer import Categorizer
-from mover import Mover
-from logger import Logger
+
+def benchmark_startup(config_path: str) -> None:
+    """Report import and initialization time for the backend components"""
+    print("\n" + "="*60)
+    print("STARTUP BENCHMARK")
+    print("="*60)
+    print(f"Module load to main: {(time.perf_counter() - _START_TIME) * 1000:.2f} ms")
+    
+    for name in backend.__all__:
+        t0 = time.perf_counter()
+        getattr(backend, name)
+        print(f"Import {name}: {(time.perf_counter() - t0) * 1000:.2f} ms")
+    
+    t0 = time.perf_counter()
+    config_manager = backend.ConfigManager(config_path)
+    config_manager.load_config()
+    print(f"Load configuration: {(time.perf_counter() - t0) * 1000:.2f} ms")
+    
+    t0 = time.perf_counter()
+    backend.Categorizer(config_manager.get_categories())
+    print(f"Build categorizer: {(time.perf_counter() - t0) * 1000:.2f} ms")
+    
+    total_ms = (time.perf_counter() - _START_TIME) * 1000
+    status = "OK" if total_ms < STARTUP_TARGET_MS else "OVER BUDGET"
+    print(f"\nTotal startup: {total_ms:.2f} ms (target < {STARTUP_TARGET_MS:.0f} ms) - {status}")
+    print("="*60 + "\n")
+
+
+def parse_size(value: str) -> int:
+    """Parse a size like 500, 10K, 20MB or 1.5G into bytes"""
+    units = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    text = value.strip().upper().rstrip("B")
+    number = text.rstrip("KMGT")
+    unit = text[len(number):]
+    if unit not in units:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value}")
+    try:
+        return int(float(number) * units[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value}")
+
+
+def search_files(args) -> None:
+    """Search the metadata index of organized files"""
+    from src.backend.index import shared_index
+    
+    try:
+        config_manager = backend.ConfigManager(args.config)
+        config_manager.load_config()
+        target_base = str(Path(config_manager.get_target_base_path()).expanduser())
+        index_file = config_manager.get_index_file()
+        
+        if not index_file:
+            print("❌ Indexing is disabled (index_file is empty in the configuration)")
+            sys.exit(1)
+        
+        index = shared_index(str(Path(index_file).expanduser()), target_base)
+        if args.rebuild_index:
+            print(f"Re-indexed {index.rebuild(target_base)} files")
+        
+        results = index.search(
+            args.query,
+            category=args.category,
+            extension=args.ext,
+            min_size=args.min_size,
+            max_size=args.max_size,
+            after=args.after,
+            before=args.before,
+            source=args.source,
+            limit=args.limit
+        )
+    except ValueError as e:
+        print(f"\n❌ Error: {e}")
+        sys.exit(1)
+    
+    for result in results:
+        modified = time.strftime("%Y-%m-%d %H:%M", time.localtime(result["mtime"]))
+        print(f"  [{result['category']}] {result['name']}  ({result['size']} bytes, {modified})")
+        print(f"      {result['path']}")
+        if result["source"]:
+            print(f"      from {result['source']}")
+    print(f"\n{len(results)} result(s)")
 
 
 def main():
@@ -28,9 +112,36 @@ def main():
         action="store_true",
         help="Preview changes without moving files"
     )
+    parser.add_argument(
+        "--benchmark-startup",
+        action="store_true",
+        help="Report import and initialization time, then exit"
+    )
+    
+    subparsers = parser.add_subparsers(dest="command")
+    search_parser = subparsers.add_parser("search", help="Search organized files")
+    search_parser.add_argument("query", nargs="?", default="", help="Words or word prefixes in the filename")
+    search_parser.add_argument("--config", default=argparse.SUPPRESS, help="Path to configuration file")
+    search_parser.add_argument("--category", help="Only files in this category")
+    search_parser.add_argument("--ext", help="Only files with this extension, e.g. pdf")
+    search_parser.add_argument("--min-size", type=parse_size, help="Minimum size, e.g. 10MB")
+    search_parser.add_argument("--max-size", type=parse_size, help="Maximum size, e.g. 1G")
+    search_parser.add_argument("--after", help="Modified on or after YYYY-MM-DD")
+    search_parser.add_argument("--before", help="Modified before YYYY-MM-DD")
+    search_parser.add_argument("--source", help="Original location path prefix")
+    search_parser.add_argument("--limit", type=int, default=50, help="Maximum results (default: 50)")
+    search_parser.add_argument("--rebuild-index", action="store_true", help="Re-index files on disk first")
     
     args = parser.parse_args()
     
+    if args.benchmark_startup:
+        benchmark_startup(args.config)
+        return
+    
+    if args.command == "search":
+        search_files(args)
+        return
+    
     print("\n" + "="*60)
     print("AutoDeskCleaner - Desktop File Organizer")
     print("="*60 + "\n")
@@ -39,7 +150,7 @@ def main():
     try:
         # Load configuration
         print(f"Loading configuration from {args.config}...")
-        config_manager = ConfigManager(args.config)
+        config_manager = backend.ConfigManager(args.config)
         config_manager.load_config()
         
         desktop_path = config_manager.get_desktop_path()
@@ -47,6 +158,10 @@ def main():
         categories = config_manager.get_categories()
         system_files = config_manager.get_system_files()
         log_file = config_manager.get_log_file()
+        throttle_settings = config_manager.get_throttle_settings()
+        transfer_settings = config_manager.get_transfer_settings()
+        index_file = config_manager.get_index_file()
+        history_file = config_manager.get_history_file()
         
         # Expand user paths
         desktop_path = str(Path(desktop_path).expanduser())
@@ -59,11 +174,23 @@ def main():
         if args.dry_run:
             print("\n*** DRY RUN MODE - No files will be moved ***\n")
         
-        # Initialize modules
-        scanner = Scanner(system_files)
-        categorizer = Categorizer(categories)
-        mover = Mover()
-        logger = Logger()
+        # Initialize modules (the mover is only needed for real runs)
+        scanner = backend.Scanner(system_files)
+        categorizer = backend.Categorizer(categories)
+        mover = None
+        if not args.dry_run:
+            throttle = None
+            if throttle_settings:
+                from src.backend.throttle import apply_io_priority, shared_throttle
+                throttle = shared_throttle(throttle_settings)
+                apply_io_priority(throttle.io_priority)
+                print("I/O throttling enabled")
+            index = None
+            if index_file:
+                from src.backend.index import shared_index
+                index = shared_index(str(Path(index_file).expanduser()), target_base)
+            mover = backend.Mover(throttle, transfer_settings, index)
+        logger = backend.Logger()
         
         # Scan desktop
         print("\nScanning desktop...")
@@ -76,23 +203,24 @@ def main():
         
         # Process each file
         print("\nProcessing files...")
-        for filepath in files:
-            filename = Path(filepath).name
-            
-            # Categorize
-            category = categorizer.categorize_file(filepath)
-            
-            if args.dry_run:
+        if args.dry_run:
+            for filepath in files:
+                filename = Path(filepath).name
+                category = categorizer.categorize_file(filepath)
+                
                 # Dry run - just preview
                 print(f"  [{category}] {filename}")
                 logger.log_success(filepath, f"{target_base}/{category}/{filename}", category)
-            else:
-                # Actually move the file
-                success, destination, error = mover.move_file(filepath, category, target_base)
+        else:
+            # Actually move the files; large files run on their own lane,
+            # so results arrive in completion order
+            items = ((filepath, categorizer.categorize_file(filepath)) for filepath in files)
+            for filepath, category, success, destination, error in mover.move_files(items, target_base):
+                filename = Path(filepath).name
                 
                 if success:
                     print(f"  ✓ [{category}] {filename}")
-                    logger.log_success(filepath, destination, category)
+                    logger.log_success(filepath, destination, category, mover.pop_checksum(destination))
                 else:
                     print(f"  ✗ [{category}] {filename} - {error}")
                     logger.log_error(filepath, error, category)
@@ -104,6 +232,14 @@ def main():
         if not args.dry_run:
             logger.write_to_file(log_file)
             print(f"Log written to: {log_file}")
+            
+            # Add this run to the usage history
+            if history_file:
+                from src.backend.analytics import record_history
+                warning = record_history(str(Path(history_file).expanduser()), logger.operations,
+                                         logger.get_summary())
+                if warning:
+                    print(f"Warning: {warning}")
         
         print("\nCleanup complete!")
     
@@ -0,0 +1 @@
+"""AutoDeskCleaner source package"""
@@ -0,0 +1 @@
+"""AutoDeskCleaner web API package"""
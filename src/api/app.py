@@ -1,38 +1,91 @@
 """Flask API for AutoDeskCleaner Web Interface"""
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Blueprint, Flask, current_app, jsonify, request, send_from_directory
 from flask_cors import CORS
-import sys
+import argparse
+import json
 import os
+import sys
+import tempfile
+import threading
 from pathlib import Path
 
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+# Allow running as a script (python src/api/app.py) as well as a module
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from src.backend.config_manager import ConfigManager
+from src.backend.scanner import Scanner
+from src.backend.categorizer import Categorizer
+from src.backend.mover import Mover
+from src.backend.logger import Logger
+from src.backend.throttle import shared_throttle
+from src.backend.index import SEARCH_FILTERS, shared_index
+from src.backend.analytics import record_history, shared_history
+from src.api.state import JobStore
+
+FRONTEND_DIR = str(Path(__file__).resolve().parent.parent / "frontend")
+
+api = Blueprint("api", __name__)
+
+
+def _state() -> dict:
+    """Get the per-application shared state"""
+    return current_app.extensions["autodeskcleaner"]
+
+
+def _load_config() -> ConfigManager:
+    """Load a fresh configuration for the current request"""
+    config_manager = ConfigManager(current_app.config["CONFIG_PATH"])
+    config_manager.load_config()
+    return config_manager
+
+
+def _similar_image_groups(config_manager: ConfigManager, file_data: list) -> list:
+    """Group near-duplicate images among scanned files, if enabled"""
+    settings = config_manager.get_image_similarity_settings()
+    flag = request.args.get('similar')
+    enabled = flag.lower() in ('1', 'true', 'yes') if flag is not None else settings.get("enabled", False)
+    if not enabled:
+        return []
+    
+    from src.backend.perceptual import find_similar_images
+    category = settings.get("category", "Images")
+    images = [f["path"] for f in file_data if f["category"] == category]
+    groups = find_similar_images(images, settings.get("max_distance", 6), settings.get("workers") or None)
+    return [{"files": group} for group in groups]
+
 
-from config_manager import ConfigManager
-from scanner import Scanner
-from categorizer import Categorizer
-from mover import Mover
-from logger import Logger
+def _get_index(config_manager: ConfigManager):
+    """Get the shared metadata index, or None if indexing is disabled"""
+    index_file = config_manager.get_index_file()
+    if not index_file:
+        return None
+    target_base = str(Path(config_manager.get_target_base_path()).expanduser())
+    return shared_index(str(Path(index_file).expanduser()), target_base)
 
-app = Flask(__name__, static_folder='../frontend', static_url_path='')
-CORS(app)
 
-# Global instances
-config_manager = ConfigManager("config.json")
-logger = Logger()
+def _history_path(config_manager: ConfigManager) -> str:
+    """Get the usage history log path, or "" if history is disabled"""
+    history_file = config_manager.get_history_file()
+    return str(Path(history_file).expanduser()) if history_file else ""
 
 
-@app.route('/')
+def _get_history(config_manager: ConfigManager):
+    """Get the shared usage history, or None if history is disabled"""
+    return shared_history(_history_path(config_manager))
+
+
+@api.route('/')
 def index():
     """Serve frontend"""
-    return send_from_directory(app.static_folder, 'index.html')
+    return send_from_directory(current_app.static_folder, 'index.html')
 
 
-@app.route('/api/scan', methods=['GET'])
+@api.route('/api/scan', methods=['GET'])
 def scan_desktop():
     """Scan desktop and return file list with categories"""
     try:
-        config_manager.load_config()
+        config_manager = _load_config()
         desktop_path = str(Path(config_manager.get_desktop_path()).expanduser())
         system_files = config_manager.get_system_files()
         categories = config_manager.get_categories()
@@ -64,21 +117,22 @@ def scan_desktop():
             "success": True,
             "files": file_data,
             "total": len(files),
-            "categories": category_counts
+            "categories": category_counts,
+            "similar_images": _similar_image_groups(config_manager, file_data)
         })
     
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/preview', methods=['POST'])
+@api.route('/api/preview', methods=['POST'])
 def preview_cleanup():
     """Preview what cleanup would do"""
     try:
         data = request.json
         files = data.get('files', [])
         
-        config_manager.load_config()
+        config_manager = _load_config()
         target_base = str(Path(config_manager.get_target_base_path()).expanduser())
         
         preview_data = []
@@ -104,31 +158,34 @@ def preview_cleanup():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/cleanup', methods=['POST'])
+@api.route('/api/cleanup', methods=['POST'])
 def execute_cleanup():
     """Execute the cleanup operation"""
+    jobs = _state()["jobs"]
+    job_id = None
+    logger = Logger()
     try:
         data = request.json
         files = data.get('files', [])
         
-        config_manager.load_config()
+        config_manager = _load_config()
         target_base = str(Path(config_manager.get_target_base_path()).expanduser())
         log_file = str(Path(config_manager.get_log_file()).expanduser())
         
-        mover = Mover()
-        global logger
-        logger = Logger()
+        mover = Mover(
+            shared_throttle(config_manager.get_throttle_settings()),
+            config_manager.get_transfer_settings(),
+            _get_index(config_manager)
+        )
+        job_id = jobs.start_job()
         
         results = []
-        for file_info in files:
-            filepath = file_info['path']
-            category = file_info['category']
+        items = ((file_info['path'], file_info['category']) for file_info in files)
+        for filepath, category, success, destination, error in mover.move_files(items, target_base):
             filename = os.path.basename(filepath)
             
-            success, destination, error = mover.move_file(filepath, category, target_base)
-            
             if success:
-                logger.log_success(filepath, destination, category)
+                logger.log_success(filepath, destination, category, mover.pop_checksum(destination))
                 results.append({
                     "filename": filename,
                     "status": "success",
@@ -145,21 +202,53 @@ def execute_cleanup():
         # Write log
         logger.write_to_file(log_file)
         
+        summary = logger.get_summary()
+        history_warning = record_history(_history_path(config_manager), logger.operations, summary)
+        jobs.finish_job(job_id, summary)
+        
+        response = {
+            "success": True,
+            "job_id": job_id,
+            "results": results,
+            "summary": summary
+        }
+        if history_warning:
+            response["warning"] = history_warning
+        return jsonify(response)
+    
+    except Exception as e:
+        if job_id is not None:
+            jobs.finish_job(job_id, logger.get_summary(), status="failed")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@api.route('/api/search', methods=['GET'])
+def search_files():
+    """Search organized files by name, category, extension, size, date and source"""
+    try:
+        index = _get_index(_load_config())
+        if index is None:
+            return jsonify({"success": False, "error": "Indexing is disabled"}), 400
+        
+        filters = {key: request.args[key] for key in SEARCH_FILTERS if request.args.get(key)}
+        results = index.search(request.args.get('q', ''), **filters)
         return jsonify({
             "success": True,
             "results": results,
-            "summary": logger.get_summary()
+            "total": len(results)
         })
     
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/logs', methods=['GET'])
+@api.route('/api/logs', methods=['GET'])
 def get_logs():
     """Get recent operation logs"""
     try:
-        config_manager.load_config()
+        config_manager = _load_config()
         log_file = str(Path(config_manager.get_log_file()).expanduser())
         
         if not os.path.exists(log_file):
@@ -179,12 +268,12 @@ def get_logs():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/config', methods=['GET', 'POST'])
+@api.route('/api/config', methods=['GET', 'POST'])
 def manage_config():
     """Get or update configuration"""
     try:
         if request.method == 'GET':
-            config_manager.load_config()
+            config_manager = _load_config()
             return jsonify({
                 "success": True,
                 "config": config_manager.config
@@ -192,13 +281,22 @@ def manage_config():
         
         else:  # POST
             new_config = request.json
+            config_path = current_app.config["CONFIG_PATH"]
             
-            # Validate and save
-            with open("config.json", 'w', encoding='utf-8') as f:
-                import json
-                json.dump(new_config, f, indent=2)
+            # Write to a temporary file and swap it in, so concurrent
+            # readers never see a partially written configuration
+            with _state()["config_lock"]:
+                config_dir = os.path.dirname(os.path.abspath(config_path))
+                fd, tmp_path = tempfile.mkstemp(dir=config_dir, suffix=".tmp")
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(new_config, f, indent=2)
+                    os.replace(tmp_path, config_path)
+                except Exception:
+                    os.unlink(tmp_path)
+                    raise
             
-            config_manager.load_config()
+            _load_config()
             
             return jsonify({
                 "success": True,
@@ -209,14 +307,99 @@ def manage_config():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/api/stats', methods=['GET'])
 def get_stats():
-    """Get current statistics"""
+    """Get statistics for the latest cleanup, or a specific job via ?job_id="""
+    jobs = _state()["jobs"]
+    job_id = request.args.get('job_id')
+    
+    if job_id:
+        job = jobs.get_job(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": f"Unknown job: {job_id}"}), 404
+        return jsonify({
+            "success": True,
+            "job": job,
+            "stats": job["summary"] or Logger().get_summary()
+        })
+    
+    # After a restart, fall back to the last run in the usage history
+    stats = jobs.get_latest_summary()
+    if stats is None:
+        try:
+            history = _get_history(_load_config())
+            stats = history.last_run() if history is not None else None
+        except Exception:
+            stats = None
+    
     return jsonify({
         "success": True,
-        "stats": logger.get_summary()
+        "stats": stats or Logger().get_summary()
     })
 
 
+@api.route('/api/stats/history', methods=['GET'])
+def get_stats_history():
+    """Get files and bytes per category and extension over time
+    
+    Query parameters: granularity (hour, day or month), days, since, until
+    """
+    try:
+        history = _get_history(_load_config())
+        if history is None:
+            return jsonify({"success": False, "error": "Usage history is disabled"}), 400
+        
+        granularity = request.args.get('granularity', 'day')
+        series = history.history(
+            granularity,
+            since=request.args.get('since'),
+            until=request.args.get('until'),
+            days=request.args.get('days', type=float)
+        )
+        return jsonify({
+            "success": True,
+            "granularity": granularity,
+            "series": series,
+            "totals": history.totals(series)
+        })
+    
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def create_app(config_path: str = "config.json") -> Flask:
+    """Create the AutoDeskCleaner Flask application"""
+    app = Flask(__name__, static_folder=FRONTEND_DIR, static_url_path='')
+    app.config["CONFIG_PATH"] = config_path
+    app.extensions["autodeskcleaner"] = {
+        "jobs": JobStore(),
+        "config_lock": threading.Lock()
+    }
+    CORS(app)
+    app.register_blueprint(api)
+    return app
+
+
+def main():
+    """Run the web server"""
+    parser = argparse.ArgumentParser(description="AutoDeskCleaner web interface")
+    parser.add_argument("--config", default="config.json", help="Path to configuration file")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=5000, help="Port to listen on (default: 5000)")
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads (default: 8)")
+    parser.add_argument("--debug", action="store_true", help="Use the Flask development server")
+    args = parser.parse_args()
+    
+    app = create_app(args.config)
+    
+    if args.debug:
+        app.run(debug=True, host=args.host, port=args.port)
+    else:
+        from src.api.server import serve
+        serve(app, host=args.host, port=args.port, threads=args.threads)
+
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    main()
@@ -0,0 +1,456 @@
+"""Asyncio (ASGI) API for AutoDeskCleaner
+
+Blocking filesystem work is run by the existing Scanner, Categorizer and
+Mover on bounded thread pools. Scan and cleanup results are streamed to
+the client as NDJSON while they are produced; a bounded buffer between the
+worker thread and the event loop pauses the worker when a client reads
+slowly. Streams run on their own threads, capped by a semaphore, so
+clients that stop reading never hold up short requests.
+
+Run with any ASGI server, e.g.::
+
+    uvicorn --factory src.api.asgi:create_asgi_app
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs
+
+# Allow running as a script (python src/api/asgi.py) as well as a module
+if not __package__:
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+from src.backend.config_manager import ConfigManager
+from src.backend.scanner import Scanner
+from src.backend.categorizer import Categorizer
+from src.backend.mover import Mover
+from src.backend.logger import Logger
+from src.backend.throttle import shared_throttle
+from src.backend.index import SEARCH_FILTERS, shared_index
+from src.backend.analytics import record_history, shared_history
+from src.api.state import JobStore
+
+
+class AsyncCleanerService:
+    """Runs scan and cleanup jobs on bounded executors for asyncio callers"""
+
+    def __init__(self, config_path: str = "config.json", max_workers: int = 8,
+                 max_active_jobs: Optional[int] = None, queue_size: int = 16,
+                 batch_size: int = 64, flush_interval: float = 0.05):
+        """Initialize the service with executor and backpressure limits"""
+        self.config_path = config_path
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cleaner")
+        self.max_active_jobs = max_active_jobs or max_workers
+        # Streaming jobs get their own threads, one per job slot
+        self.stream_executor = ThreadPoolExecutor(
+            max_workers=self.max_active_jobs, thread_name_prefix="cleaner-stream"
+        )
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.jobs = JobStore()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _job_slots(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore belongs to the running loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_active_jobs)
+        return self._slots
+
+    def _load_config(self) -> ConfigManager:
+        config_manager = ConfigManager(self.config_path)
+        config_manager.load_config()
+        return config_manager
+
+    def _get_index(self, config_manager: ConfigManager):
+        index_file = config_manager.get_index_file()
+        if not index_file:
+            return None
+        target_base = str(Path(config_manager.get_target_base_path()).expanduser())
+        return shared_index(str(Path(index_file).expanduser()), target_base)
+
+    def _history_path(self, config_manager: ConfigManager) -> str:
+        history_file = config_manager.get_history_file()
+        return str(Path(history_file).expanduser()) if history_file else ""
+
+    def _get_history(self, config_manager: ConfigManager):
+        return shared_history(self._history_path(config_manager))
+
+    async def history(self, granularity: str, since: Optional[str] = None,
+                      until: Optional[str] = None, days: Optional[float] = None) -> Optional[Dict]:
+        """Get usage history per period, or None if history is disabled"""
+        def run_history():
+            history = self._get_history(self._load_config())
+            if history is None:
+                return None
+            series = history.history(granularity, since=since, until=until, days=days)
+            return {"series": series, "totals": history.totals(series)}
+        return await self.run(run_history)
+
+    async def last_run_summary(self) -> Optional[Dict]:
+        """Summary of the last recorded run, from memory or the usage history"""
+        summary = self.jobs.get_latest_summary()
+        if summary is not None:
+            return summary
+
+        def run_lookup():
+            history = self._get_history(self._load_config())
+            return history.last_run() if history is not None else None
+        try:
+            return await self.run(run_lookup)
+        except Exception:
+            return None
+
+    async def search(self, query: str, filters: Dict) -> Optional[List[Dict]]:
+        """Search the metadata index, or return None if indexing is disabled"""
+        def run_search():
+            index = self._get_index(self._load_config())
+            return None if index is None else index.search(query, **filters)
+        return await self.run(run_search)
+
+    async def run(self, func: Callable, *args):
+        """Run a blocking function on the executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def stream(self, iterator_factory: Callable[..., Iterator], *args) -> AsyncIterator:
+        """Iterate a blocking iterator on a stream thread, yielding items as they arrive
+
+        Items are handed to the event loop in batches: as soon as batch_size
+        are waiting, or after flush_interval for whatever has arrived. The
+        worker pauses while queue_size batches are waiting.
+        """
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+        condition = threading.Condition()
+        stopped = threading.Event()
+        pending: List = []
+        limit = self.queue_size * self.batch_size
+        finished = False
+        error: Optional[BaseException] = None
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The loop has closed; nobody is reading any more
+                pass
+
+        def produce():
+            nonlocal finished, error
+            iterator = iterator_factory(*args)
+            try:
+                for item in iterator:
+                    with condition:
+                        # Block while the buffer is full, giving up if the
+                        # consumer has gone away
+                        while len(pending) >= limit and not stopped.is_set():
+                            condition.wait(0.5)
+                        if stopped.is_set():
+                            return
+                        pending.append(item)
+                        full = len(pending) == self.batch_size
+                    if full:
+                        wake()
+            except BaseException as e:
+                error = e
+            finally:
+                # Close a generator here, on its own thread, so its cleanup
+                # is done by the time the stream ends
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                with condition:
+                    finished = True
+                wake()
+
+        async with self._job_slots():
+            producer = loop.run_in_executor(self.stream_executor, produce)
+            try:
+                while True:
+                    try:
+                        await asyncio.wait_for(ready.wait(), self.flush_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    ready.clear()
+                    with condition:
+                        batch = pending[:]
+                        del pending[:]
+                        done = finished
+                        condition.notify_all()
+                    for item in batch:
+                        yield item
+                    if done:
+                        break
+                await producer
+                if error is not None:
+                    raise error
+            finally:
+                stopped.set()
+                with condition:
+                    condition.notify_all()
+                # On an early exit, wait for the worker to stop so whatever it
+                # recorded is complete when the caller's cleanup runs
+                if not producer.done():
+                    await asyncio.wait([producer])
+
+    async def iter_scan(self) -> AsyncIterator[Dict]:
+        """Scan the desktop, yielding categorized file records as they are found"""
+        config_manager = await self.run(self._load_config)
+        desktop_path = str(Path(config_manager.get_desktop_path()).expanduser())
+        scanner = Scanner(config_manager.get_system_files())
+        categorizer = Categorizer(config_manager.get_categories())
+
+        async for filepath in self.stream(scanner.iter_desktop, desktop_path):
+            yield {
+                "path": filepath,
+                "name": os.path.basename(filepath),
+                "category": categorizer.categorize_file(filepath),
+                "extension": scanner.get_file_extension(filepath)
+            }
+
+    async def similar_image_groups(self, file_records: List[Dict],
+                                   enabled: Optional[bool] = None) -> List[Dict]:
+        """Group near-duplicate images among scanned records, if enabled"""
+        def run_grouping():
+            settings = self._load_config().get_image_similarity_settings()
+            if not (settings.get("enabled", False) if enabled is None else enabled):
+                return []
+            from src.backend.perceptual import find_similar_images
+            category = settings.get("category", "Images")
+            images = [r["path"] for r in file_records if r["category"] == category]
+            groups = find_similar_images(images, settings.get("max_distance", 6), settings.get("workers") or None)
+            return [{"files": group} for group in groups]
+        return await self.run(run_grouping)
+
+    async def iter_cleanup(self, files: List[Dict], job_id: str) -> AsyncIterator[Dict]:
+        """Move files, yielding a result record per file, then the summary"""
+        config_manager = await self.run(self._load_config)
+        target_base = str(Path(config_manager.get_target_base_path()).expanduser())
+        log_file = str(Path(config_manager.get_log_file()).expanduser())
+
+        # Opening the index may rebuild it from disk, so keep it off the loop
+        index = await self.run(self._get_index, config_manager)
+        mover = Mover(
+            shared_throttle(config_manager.get_throttle_settings()),
+            config_manager.get_transfer_settings(),
+            index
+        )
+        history_path = self._history_path(config_manager)
+        logger = Logger()
+
+        def log_result(filepath: str, category: str, success: bool, destination: str, error: str) -> Dict:
+            filename = os.path.basename(filepath)
+            if success:
+                logger.log_success(filepath, destination, category, mover.pop_checksum(destination))
+                return {"filename": filename, "status": "success", "destination": destination}
+            logger.log_error(filepath, error, category)
+            return {"filename": filename, "status": "failed", "error": error}
+
+        def move_all() -> Iterator[Dict]:
+            items = ((file_info['path'], file_info['category']) for file_info in files)
+            # Moves that finish after the client goes away are still logged
+            for result in mover.move_files(items, target_base, on_abandoned=log_result):
+                yield log_result(*result)
+
+        completed = False
+        results = self.stream(move_all)
+        try:
+            async for result in results:
+                yield result
+            completed = True
+        finally:
+            # Stop the moves, then log every file already moved, even if the
+            # client went away
+            await results.aclose()
+            await self.run(logger.write_to_file, log_file)
+            summary = logger.get_summary()
+            history_warning = await self.run(record_history, history_path, logger.operations, summary)
+            self.jobs.finish_job(job_id, summary, status="completed" if completed else "failed")
+
+        record = {"type": "summary", "job_id": job_id, "summary": summary}
+        if history_warning:
+            record["warning"] = history_warning
+        yield record
+
+    def close(self) -> None:
+        """Shut down the executors"""
+        self.executor.shutdown(wait=False)
+        self.stream_executor.shutdown(wait=False)
+
+
+async def _read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            break
+    return body
+
+
+async def _send_json(send, payload: Dict, status: int = 200) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode())]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_ndjson(send, records: AsyncIterator[Dict]) -> None:
+    """Stream records as NDJSON; errors after the headers become an error record"""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"application/x-ndjson")]
+    })
+    try:
+        async for record in records:
+            line = json.dumps(record).encode("utf-8") + b"\n"
+            await send({"type": "http.response.body", "body": line, "more_body": True})
+    except Exception as e:
+        line = json.dumps({"type": "error", "error": str(e)}).encode("utf-8") + b"\n"
+        await send({"type": "http.response.body", "body": line, "more_body": True})
+    finally:
+        # If send failed (the client went away), finish the job's cleanup now
+        await records.aclose()
+    await send({"type": "http.response.body", "body": b""})
+
+
+class CleanerASGIApp:
+    """ASGI application exposing streaming scan and cleanup endpoints"""
+
+    def __init__(self, service: AsyncCleanerService):
+        """Initialize the app around a service instance"""
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        route = (scope["method"], scope["path"])
+        try:
+            if route == ("GET", "/api/scan"):
+                await _send_ndjson(send, self._scan_records(scope))
+            elif route == ("POST", "/api/cleanup"):
+                data = json.loads(await _read_body(receive) or b"{}")
+                job_id = self.service.jobs.start_job()
+                await _send_ndjson(send, self.service.iter_cleanup(data.get('files', []), job_id))
+            elif route == ("GET", "/api/stats"):
+                await self._stats(scope, send)
+            elif route == ("GET", "/api/stats/history"):
+                await self._history(scope, send)
+            elif route == ("GET", "/api/search"):
+                await self._search(scope, send)
+            else:
+                await _send_json(send, {"success": False, "error": "Not found"}, 404)
+        except Exception as e:
+            await _send_json(send, {"success": False, "error": str(e)}, 500)
+
+    async def _scan_records(self, scope) -> AsyncIterator[Dict]:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        flag = query.get("similar", [None])[0]
+        enabled = flag.lower() in ("1", "true", "yes") if flag is not None else None
+
+        total = 0
+        category_counts = {}
+        records = []
+        async for record in self.service.iter_scan():
+            total += 1
+            category_counts[record["category"]] = category_counts.get(record["category"], 0) + 1
+            records.append(record)
+            yield record
+
+        yield {
+            "type": "summary",
+            "total": total,
+            "categories": category_counts,
+            "similar_images": await self.service.similar_image_groups(records, enabled)
+        }
+
+    async def _search(self, scope, send) -> None:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        filters = {key: query[key][0] for key in SEARCH_FILTERS if query.get(key, [""])[0]}
+        try:
+            results = await self.service.search(query.get("q", [""])[0], filters)
+        except ValueError as e:
+            await _send_json(send, {"success": False, "error": str(e)}, 400)
+            return
+        if results is None:
+            await _send_json(send, {"success": False, "error": "Indexing is disabled"}, 400)
+            return
+        await _send_json(send, {"success": True, "results": results, "total": len(results)})
+
+    async def _stats(self, scope, send) -> None:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        job_id = query.get("job_id", [""])[0]
+        jobs = self.service.jobs
+
+        if job_id:
+            job = jobs.get_job(job_id)
+            if job is None:
+                await _send_json(send, {"success": False, "error": f"Unknown job: {job_id}"}, 404)
+                return
+            await _send_json(send, {
+                "success": True,
+                "job": job,
+                "stats": job["summary"] or Logger().get_summary()
+            })
+            return
+
+        await _send_json(send, {
+            "success": True,
+            "stats": await self.service.last_run_summary() or Logger().get_summary()
+        })
+
+    async def _history(self, scope, send) -> None:
+        query = parse_qs(scope.get("query_string", b"").decode())
+        granularity = query.get("granularity", ["day"])[0]
+        try:
+            days = query.get("days", [""])[0]
+            result = await self.service.history(
+                granularity,
+                since=query.get("since", [None])[0],
+                until=query.get("until", [None])[0],
+                days=float(days) if days else None
+            )
+        except ValueError as e:
+            await _send_json(send, {"success": False, "error": str(e)}, 400)
+            return
+        if result is None:
+            await _send_json(send, {"success": False, "error": "Usage history is disabled"}, 400)
+            return
+        await _send_json(send, {"success": True, "granularity": granularity, **result})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.service.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(config_path: str = "config.json", max_workers: int = 8) -> CleanerASGIApp:
+    """Create the AutoDeskCleaner ASGI application"""
+    return CleanerASGIApp(AsyncCleanerService(config_path, max_workers=max_workers))
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(create_asgi_app(), host="127.0.0.1", port=5001)
@@ -0,0 +1,71 @@
+"""Multi-threaded WSGI serving for AutoDeskCleaner"""
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+    """Request handler that does not log every request to stderr"""
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI server that handles requests on a bounded thread pool"""
+    
+    request_queue_size = 128
+    threads = 8
+    
+    def server_activate(self):
+        """Start listening and create the worker pool"""
+        super().server_activate()
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="wsgi")
+    
+    def process_request(self, request, client_address):
+        """Hand the request to a worker thread"""
+        self._pool.submit(self._process_request_worker, request, client_address)
+    
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        """Stop listening and wait for in-flight requests"""
+        super().server_close()
+        pool = getattr(self, "_pool", None)
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def make_threaded_server(app, host: str = "127.0.0.1", port: int = 5000,
+                         threads: int = 8, quiet: bool = True) -> PooledWSGIServer:
+    """Create a pure-Python multi-threaded WSGI server for app"""
+    server_class = type("PooledWSGIServer", (PooledWSGIServer,), {"threads": threads})
+    handler_class = QuietWSGIRequestHandler if quiet else WSGIRequestHandler
+    return make_server(host, port, app, server_class=server_class, handler_class=handler_class)
+
+
+def serve(app, host: str = "127.0.0.1", port: int = 5000, threads: int = 8) -> None:
+    """Serve app with waitress if installed, otherwise the built-in threaded server"""
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        waitress_serve = None
+    
+    if waitress_serve is not None:
+        print(f"Serving on http://{host}:{port} (waitress, {threads} threads)")
+        waitress_serve(app, host=host, port=port, threads=threads)
+        return
+    
+    server = make_threaded_server(app, host, port, threads, quiet=False)
+    print(f"Serving on http://{host}:{port} (threaded WSGI, {threads} threads)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
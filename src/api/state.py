@@ -0,0 +1,61 @@
+"""Shared API state for AutoDeskCleaner"""
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class JobStore:
+    """Thread-safe registry of cleanup jobs and their summaries"""
+    
+    def __init__(self, max_jobs: int = 50):
+        """Initialize JobStore keeping at most max_jobs recent jobs"""
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._last_finished: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def start_job(self) -> str:
+        """Register a new running job and return its id"""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "running",
+                "started": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "finished": "",
+                "summary": None
+            }
+            # Drop the oldest jobs, but never the latest finished one
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs))
+                if oldest == self._last_finished:
+                    self._jobs.move_to_end(oldest)
+                    oldest = next(iter(self._jobs))
+                del self._jobs[oldest]
+        return job_id
+    
+    def finish_job(self, job_id: str, summary: Dict, status: str = "completed") -> None:
+        """Record the final summary of a job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = status
+            job["finished"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            job["summary"] = summary
+            self._last_finished = job_id
+    
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a snapshot of a job, or None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+    
+    def get_latest_summary(self) -> Optional[Dict]:
+        """Get the summary of the most recently finished job"""
+        with self._lock:
+            if self._last_finished is None:
+                return None
+            return self._jobs[self._last_finished]["summary"]
@@ -0,0 +1,35 @@
+"""AutoDeskCleaner backend package
+
+Components are imported on first attribute access, so a short CLI run only
+pays for the modules it actually uses.
+"""
+import importlib
+
+# Public name -> submodule that defines it
+_LAZY_ATTRS = {
+    "ConfigManager": "config_manager",
+    "Scanner": "scanner",
+    "Categorizer": "categorizer",
+    "Mover": "mover",
+    "Logger": "logger",
+    "Throttle": "throttle",
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    """Import the submodule providing ``name`` on first access"""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(f".{module_name}", __name__)
+    value = getattr(module, name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
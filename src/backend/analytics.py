@@ -0,0 +1,398 @@
+"""Usage History for AutoDeskCleaner
+
+Each cleanup run appends hourly rollups (files and bytes per category and
+per extension) to an append-only JSON lines log. Daily and monthly totals
+live in a small rollup file that is brought up to date incrementally from
+the log, so a query over a year reads a few hundred buckets rather than
+every run. Hourly detail older than hourly_retention_days is compacted out
+of the log, and daily buckets older than daily_retention_days are folded
+into months. Readers and writers hold a lock file, so several processes
+can share one history.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+GRANULARITIES = ("hour", "day", "month")
+
+# Period keys are prefixes of the Logger's "%Y-%m-%d %H:%M:%S" timestamps
+_KEY_LENGTH = {"hour": 13, "day": 10, "month": 7}
+
+
+def _empty_bucket() -> Dict[str, Any]:
+    return {"files": 0, "bytes": 0, "failed": 0, "categories": {}, "extensions": {}}
+
+
+def _merge(into: Dict[str, Any], bucket: Dict[str, Any]) -> None:
+    """Add bucket's counts to into; breakdowns are {name: [files, bytes]}"""
+    into["files"] += bucket.get("files", 0)
+    into["bytes"] += bucket.get("bytes", 0)
+    into["failed"] += bucket.get("failed", 0)
+    for field in ("categories", "extensions"):
+        totals = into[field]
+        for name, (files, size) in bucket.get(field, {}).items():
+            current = totals.get(name)
+            if current is None:
+                totals[name] = [files, size]
+            else:
+                current[0] += files
+                current[1] += size
+
+
+def _expand(period: str, bucket: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn a stored bucket into the dict returned to callers"""
+    return {
+        "period": period,
+        "files": bucket["files"],
+        "bytes": bucket["bytes"],
+        "failed": bucket["failed"],
+        "categories": {name: {"files": f, "bytes": b} for name, (f, b) in bucket["categories"].items()},
+        "extensions": {name: {"files": f, "bytes": b} for name, (f, b) in bucket["extensions"].items()}
+    }
+
+
+def _operation_size(operation: Dict) -> int:
+    """Bytes moved by a logged operation, read from the destination if not recorded"""
+    if "size" in operation:
+        return operation["size"]
+    try:
+        return os.stat(operation["destination"]).st_size
+    except (OSError, KeyError):
+        return 0
+
+
+def rollup_operations(operations: Iterable[Dict]) -> Dict[str, Dict[str, Any]]:
+    """Group Logger operations into hourly buckets keyed "YYYY-MM-DD HH" """
+    hours: Dict[str, Dict[str, Any]] = {}
+    for operation in operations:
+        status = operation.get("status")
+        if status not in ("success", "failed"):
+            continue
+        hour = operation["timestamp"][:_KEY_LENGTH["hour"]]
+        bucket = hours.get(hour)
+        if bucket is None:
+            bucket = hours[hour] = _empty_bucket()
+        if status == "failed":
+            bucket["failed"] += 1
+            continue
+
+        size = _operation_size(operation)
+        extension = os.path.splitext(operation["destination"])[1].lower()
+        _merge(bucket, {
+            "files": 1,
+            "bytes": size,
+            "categories": {operation.get("category") or "Others": [1, size]},
+            "extensions": {extension: [1, size]}
+        })
+    return hours
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive lock on path (created if missing) across processes"""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about ten seconds; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class UsageHistory:
+    """Persistent per-hour, per-day and per-month usage rollups"""
+
+    def __init__(self, path: str, hourly_retention_days: int = 30,
+                 daily_retention_days: int = 400):
+        """Initialize UsageHistory with the log path and retention periods"""
+        self.path = path
+        self.rollup_path = path + ".rollup.json"
+        self.lock_path = path + ".lock"
+        self.hourly_retention_days = hourly_retention_days
+        self.daily_retention_days = daily_retention_days
+        self._lock = threading.Lock()
+        self._rollup: Optional[Dict[str, Any]] = None
+        self._rollup_stamp = None
+
+        history_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(history_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Exclude other threads, and other processes such as a cron run of the CLI"""
+        with self._lock, _file_lock(self.lock_path):
+            yield
+
+    def record_run(self, operations: Iterable[Dict], summary: Optional[Dict] = None) -> int:
+        """Append one run's hourly rollups; returns the number of hours written"""
+        hours = rollup_operations(operations)
+        lines = "".join(
+            json.dumps({"hour": hour, **bucket}, separators=(",", ":")) + "\n"
+            for hour, bucket in sorted(hours.items())
+        )
+
+        with self._locked():
+            if lines:
+                self._append(lines)
+            rollup = self._catch_up(save=False)
+            if summary is not None:
+                rollup["last_run"] = {"recorded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                                      "summary": summary}
+            if self._needs_compaction(rollup):
+                self._compact(rollup)
+            self._save_rollup(rollup)
+        return len(hours)
+
+    def last_run(self) -> Optional[Dict]:
+        """Summary of the most recently recorded run, or None"""
+        with self._locked():
+            last = self._catch_up().get("last_run")
+        return last["summary"] if last else None
+
+    def history(self, granularity: str = "day", since: Optional[str] = None,
+                until: Optional[str] = None, days: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Get usage per period, oldest first
+        since/until are inclusive period prefixes such as "2024-01-31";
+        days is an alternative to since counting back from now. Hourly
+        detail only covers the hourly retention window
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        if days is not None and not since:
+            since = (datetime.now() - timedelta(days=float(days))).strftime("%Y-%m-%d %H")
+        length = _KEY_LENGTH[granularity]
+        since = since[:length] if since else None
+        until = until[:length] if until else None
+
+        periods: Dict[str, Dict[str, Any]] = {}
+        with self._locked():
+            if granularity == "hour":
+                sources = [((record.pop("hour"), record) for _, record in self._iter_log())]
+            else:
+                rollup = self._catch_up()
+                sources = [rollup["monthly"].items(), rollup["daily"].items()]
+
+            for source in sources:
+                for key, bucket in source:
+                    period = key[:length]
+                    if len(period) < length:
+                        # Months no longer have daily detail
+                        continue
+                    if (since and period < since) or (until and period[:len(until)] > until):
+                        continue
+                    totals = periods.get(period)
+                    if totals is None:
+                        totals = periods[period] = _empty_bucket()
+                    _merge(totals, bucket)
+
+        return [_expand(period, periods[period]) for period in sorted(periods)]
+
+    def totals(self, series: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine a history() series into one total"""
+        total = _empty_bucket()
+        for entry in series:
+            _merge(total, {
+                "files": entry["files"],
+                "bytes": entry["bytes"],
+                "failed": entry["failed"],
+                "categories": {k: [v["files"], v["bytes"]] for k, v in entry["categories"].items()},
+                "extensions": {k: [v["files"], v["bytes"]] for k, v in entry["extensions"].items()}
+            })
+        return _expand("total", total)
+
+    # Log file: a header line {"generation": n, "applied": bytes} followed by
+    # one line per (run, hour). After compaction, "applied" is how many bytes
+    # of data were already folded into the rollup, so a rollup saved before
+    # the compaction can tell where to resume.
+
+    def _append(self, lines: str) -> None:
+        if not os.path.exists(self.path):
+            header = json.dumps({"generation": 1, "applied": 0}) + "\n"
+            try:
+                with open(self.path, "x", encoding="utf-8") as f:
+                    f.write(header)
+            except FileExistsError:
+                pass
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def _read_header(self) -> Optional[Dict[str, int]]:
+        try:
+            with open(self.path, "rb") as f:
+                return json.loads(f.readline())
+        except FileNotFoundError:
+            return None
+
+    def _iter_log(self, offset: int = 0):
+        """Yield (length, record) for each complete data line after offset"""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            f.readline()
+            f.seek(offset, os.SEEK_CUR)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Another writer is still appending this line
+                    break
+                yield len(line), json.loads(line)
+
+    def _load_rollup(self) -> Dict[str, Any]:
+        """Load the rollup file, reusing the cached copy while it is unchanged"""
+        try:
+            stat = os.stat(self.rollup_path)
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        if self._rollup is None or stamp != self._rollup_stamp:
+            if stamp is None:
+                self._rollup = {"generation": 0, "offset": 0, "oldest_hour": None,
+                                "daily": {}, "monthly": {}, "last_run": None}
+            else:
+                with open(self.rollup_path, "r", encoding="utf-8") as f:
+                    self._rollup = json.load(f)
+            self._rollup_stamp = stamp
+        return self._rollup
+
+    def _save_rollup(self, rollup: Dict[str, Any]) -> None:
+        rollup_dir = os.path.dirname(os.path.abspath(self.rollup_path))
+        fd, tmp_path = tempfile.mkstemp(dir=rollup_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(rollup, f, separators=(",", ":"))
+            os.replace(tmp_path, self.rollup_path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        stat = os.stat(self.rollup_path)
+        self._rollup = rollup
+        self._rollup_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _catch_up(self, save: bool = True) -> Dict[str, Any]:
+        """Fold log lines written since the last save into the rollup"""
+        rollup = self._load_rollup()
+        header = self._read_header()
+        if header is None:
+            return rollup
+        if header["generation"] != rollup["generation"]:
+            rollup["generation"] = header["generation"]
+            rollup["offset"] = header["applied"]
+
+        records = list(self._iter_log(rollup["offset"]))
+        if not records:
+            return rollup
+
+        daily_cutoff = self._cutoff(self.daily_retention_days)
+        for length, record in records:
+            hour = record.pop("hour")
+            if rollup["oldest_hour"] is None or hour < rollup["oldest_hour"]:
+                rollup["oldest_hour"] = hour
+            if hour[:10] < daily_cutoff:
+                table, key = rollup["monthly"], hour[:7]
+            else:
+                table, key = rollup["daily"], hour[:10]
+            bucket = table.get(key)
+            if bucket is None:
+                bucket = table[key] = _empty_bucket()
+            _merge(bucket, record)
+            rollup["offset"] += length
+
+        if save:
+            self._save_rollup(rollup)
+        return rollup
+
+    @staticmethod
+    def _cutoff(days: int) -> str:
+        return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    def _needs_compaction(self, rollup: Dict[str, Any]) -> bool:
+        # Allow a day of slack so compaction runs at most about once a day
+        oldest = rollup["oldest_hour"]
+        return oldest is not None and oldest[:10] < self._cutoff(self.hourly_retention_days + 1)
+
+    def _compact(self, rollup: Dict[str, Any]) -> None:
+        """Drop expired hourly lines and fold expired days into months"""
+        hourly_cutoff = self._cutoff(self.hourly_retention_days)
+        records = [record for _, record in self._iter_log()]
+        retained = [
+            json.dumps(record, separators=(",", ":")) + "\n"
+            for record in records if record["hour"][:10] >= hourly_cutoff
+        ]
+        data = "".join(retained)
+        generation = rollup["generation"] + 1
+        header = json.dumps({"generation": generation, "applied": len(data.encode("utf-8"))}) + "\n"
+
+        log_dir = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=log_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(header + data)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+        rollup["generation"] = generation
+        rollup["offset"] = len(data.encode("utf-8"))
+        rollup["oldest_hour"] = min((r["hour"] for r in records if r["hour"][:10] >= hourly_cutoff),
+                                    default=None)
+
+        daily_cutoff = self._cutoff(self.daily_retention_days)
+        for day in [day for day in rollup["daily"] if day < daily_cutoff]:
+            month = rollup["monthly"].get(day[:7])
+            if month is None:
+                month = rollup["monthly"][day[:7]] = _empty_bucket()
+            _merge(month, rollup["daily"].pop(day))
+
+
+_shared_histories: Dict[str, UsageHistory] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_history(path: Optional[str]) -> Optional[UsageHistory]:
+    """Get the process-wide UsageHistory for path, or None if history is off"""
+    if not path:
+        return None
+    key = os.path.abspath(path)
+    with _shared_lock:
+        history = _shared_histories.get(key)
+        if history is None:
+            history = _shared_histories[key] = UsageHistory(path)
+        return history
+
+
+def record_history(path: Optional[str], operations: Iterable[Dict], summary: Dict) -> Optional[str]:
+    """Add a finished run to the shared history at path, if history is on
+
+    Best-effort: the files have already been moved and logged, so a failure
+    is returned as a warning message rather than raised.
+    """
+    try:
+        history = shared_history(path)
+        if history is not None:
+            history.record_run(operations, summary)
+    except Exception as e:
+        return f"Could not update usage history: {e}"
+    return None
@@ -1,6 +1,18 @@
 """File Categorizer for AutoDeskCleaner"""
 import os
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+@lru_cache(maxsize=16)
+def _compile_extension_map(categories_key: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> Dict[str, str]:
+    """Build the extension -> category lookup table for a frozen category mapping"""
+    extension_map = {}
+    for category, extensions in categories_key:
+        for ext in extensions:
+            # Normalize extensions to lowercase
+            extension_map[ext.lower()] = category
+    return extension_map
 
 
 class Categorizer:
@@ -9,12 +21,13 @@ class Categorizer:
     def __init__(self, categories: Dict[str, List[str]]):
         """Initialize Categorizer with category mappings"""
         self.categories = categories
-        # Create reverse mapping for faster lookup: extension -> category
-        self.extension_map = {}
-        for category, extensions in categories.items():
-            for ext in extensions:
-                # Normalize extensions to lowercase
-                self.extension_map[ext.lower()] = category
+        # Reverse mapping for faster lookup: extension -> category.
+        # Compiled tables are cached per mapping, so repeated runs and API
+        # requests with the same config reuse the same table.
+        categories_key = tuple(
+            (category, tuple(extensions)) for category, extensions in categories.items()
+        )
+        self.extension_map = _compile_extension_map(categories_key)
     
     def categorize_file(self, filepath: str) -> str:
         """Categorize a file based on its extension"""
@@ -75,6 +75,38 @@ class ConfigManager:
             self.load_config()
         return self.config.get("system_files", [])
     
+    def get_throttle_settings(self) -> Dict[str, Any]:
+        """Get I/O throttling settings (empty means unlimited)"""
+        if self.config is None:
+            self.load_config()
+        return self.config.get("throttle", {})
+    
+    def get_transfer_settings(self) -> Dict[str, Any]:
+        """Get file transfer settings (checksums, verification)"""
+        if self.config is None:
+            self.load_config()
+        return self.config.get("transfer", {})
+    
+    def get_index_file(self) -> str:
+        """Get metadata index database path ("" disables indexing)"""
+        if self.config is None:
+            self.load_config()
+        default = str(Path(self.get_target_base_path()) / "file_index.sqlite3")
+        return self.config.get("index_file", default) or ""
+    
+    def get_image_similarity_settings(self) -> Dict[str, Any]:
+        """Get near-duplicate image detection settings"""
+        if self.config is None:
+            self.load_config()
+        return self.config.get("image_similarity", {})
+
+    def get_history_file(self) -> str:
+        """Get usage history log path ("" disables history)"""
+        if self.config is None:
+            self.load_config()
+        default = str(Path(self.get_target_base_path()) / "usage_history.jsonl")
+        return self.config.get("history_file", default) or ""
+
     def get_log_file(self) -> str:
         """Get log file path"""
         if self.config is None:
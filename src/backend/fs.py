@@ -0,0 +1,503 @@
+"""Filesystem Layer for AutoDeskCleaner
+
+Scanner and Mover do all file I/O through a filesystem object so tests can
+swap the local disk for an in-memory tree, optionally wrapped in
+SlowFileSystem to add NAS-like latency and failures. A filesystem provides:
+
+    exists, isdir, islink, stat, getsize, scandir, makedirs, open, fsync,
+    copystat, rename, replace, move, unlink
+
+with the same behaviour and exceptions as the os/shutil functions of the
+same names. open() is only used in binary modes.
+"""
+import errno
+import io
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class LocalFileSystem:
+    """The real filesystem"""
+
+    # Functions are looked up on each call, so patching os in tests still applies
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(path)
+
+    @staticmethod
+    def isdir(path: str) -> bool:
+        return os.path.isdir(path)
+
+    @staticmethod
+    def islink(path: str) -> bool:
+        return os.path.islink(path)
+
+    @staticmethod
+    def stat(path: str) -> os.stat_result:
+        return os.stat(path)
+
+    @staticmethod
+    def getsize(path: str) -> int:
+        return os.path.getsize(path)
+
+    @staticmethod
+    def scandir(path: str):
+        return os.scandir(path)
+
+    @staticmethod
+    def rename(source: str, target: str) -> None:
+        os.rename(source, target)
+
+    @staticmethod
+    def replace(source: str, target: str) -> None:
+        os.replace(source, target)
+
+    @staticmethod
+    def unlink(path: str) -> None:
+        os.unlink(path)
+
+    @staticmethod
+    def makedirs(path: str) -> None:
+        """Create a directory and its parents, if missing"""
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def open(path: str, mode: str = "rb"):
+        """Open a file in a binary mode"""
+        return open(path, mode)
+
+    @staticmethod
+    def fsync(handle) -> None:
+        """Flush an open file to disk"""
+        os.fsync(handle.fileno())
+
+    # shutil is imported on use so scanning alone does not load it
+
+    @staticmethod
+    def copystat(source: str, target: str) -> None:
+        """Copy timestamps and permission bits"""
+        import shutil
+        shutil.copystat(source, target)
+
+    @staticmethod
+    def move(source: str, target: str) -> None:
+        """Move a file or symlink, across devices if needed"""
+        import shutil
+        shutil.move(source, target)
+
+
+LOCAL = LocalFileSystem()
+
+
+def permission_error(path: str) -> PermissionError:
+    """The error raised for a file the user may not touch"""
+    return PermissionError(errno.EACCES, "Permission denied", path)
+
+
+def file_in_use_error(path: str) -> OSError:
+    """The error Windows raises for a file locked by another process"""
+    return OSError(errno.EBUSY, "The process cannot access the file because it is being used by another process", path)
+
+
+class MemoryStat:
+    """The stat fields Scanner, Mover and the index use"""
+
+    def __init__(self, size: int, mtime_ns: int, is_dir: bool = False):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+        self.st_mtime = mtime_ns / 1e9
+        self.st_mode = 0o040755 if is_dir else 0o100644
+
+
+class MemoryDirEntry:
+    """A scandir() entry of a MemoryFileSystem"""
+
+    def __init__(self, directory: str, name: str, is_dir: bool):
+        self.name = name
+        self.path = os.path.join(directory, name)
+        self._is_dir = is_dir
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        return self._is_dir
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        return not self._is_dir
+
+
+class _MemoryFile:
+    __slots__ = ("data", "mtime_ns")
+
+    def __init__(self, data: bytes = b"", mtime_ns: Optional[int] = None):
+        self.data = bytes(data)
+        self.mtime_ns = time.time_ns() if mtime_ns is None else mtime_ns
+
+
+class _MemoryHandle(io.BytesIO):
+    """An open file whose contents are stored back when flushed or closed"""
+
+    def __init__(self, fs: "MemoryFileSystem", path: str, data: bytes, writable: bool):
+        super().__init__(data)
+        self._fs = fs
+        self._path = path
+        self._writable = writable
+
+    def flush(self) -> None:
+        super().flush()
+        if self._writable and not self.closed:
+            self._fs._store(self._path, self.getvalue())
+
+    def close(self) -> None:
+        if not self.closed:
+            self.flush()
+        super().close()
+
+
+class MemoryFileSystem:
+    """A thread-safe in-memory filesystem
+
+    Paths under any of the given device prefixes count as separate devices,
+    so renames across them fail with EXDEV like moves onto another drive.
+    """
+
+    def __init__(self, devices: Iterable[str] = ()):
+        """Initialize an empty tree with the root directory"""
+        self._lock = threading.Lock()
+        self._files: Dict[str, _MemoryFile] = {}
+        # Directory path -> {child name: is_dir}, in creation order
+        self._dirs: Dict[str, Dict[str, bool]] = {os.sep: {}}
+        self.devices = sorted((os.path.normpath(d) for d in devices), key=len, reverse=True)
+
+    @staticmethod
+    def _norm(path: str) -> str:
+        path = os.fspath(path)
+        # Skip normpath for paths that are already normal absolute POSIX paths
+        if (os.altsep is None and path.startswith("/") and not path.endswith("/")
+                and "//" not in path and "/." not in path):
+            return path
+        # Relative paths are taken from the root
+        return os.path.normpath(os.path.join(os.sep, path))
+
+    def _device(self, path: str) -> str:
+        for device in self.devices:
+            if path == device or path.startswith(device + os.sep):
+                return device
+        return os.sep
+
+    def _parent(self, path: str) -> Dict[str, bool]:
+        """Get the child table of path's parent; the lock must be held"""
+        parent = self._dirs.get(os.path.dirname(path))
+        if parent is None:
+            raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+        return parent
+
+    def _store(self, path: str, data: bytes) -> None:
+        with self._lock:
+            self._parent(path)[os.path.basename(path)] = False
+            existing = self._files.get(path)
+            if existing is None:
+                self._files[path] = _MemoryFile(data)
+            else:
+                existing.data = data
+                existing.mtime_ns = time.time_ns()
+
+    def add_file(self, path: str, data: bytes = b"", mtime_ns: Optional[int] = None) -> None:
+        """Create a file, and its parent directories, with the given contents"""
+        path = self._norm(path)
+        self.makedirs(os.path.dirname(path))
+        with self._lock:
+            self._parent(path)[os.path.basename(path)] = False
+            self._files[path] = _MemoryFile(data, mtime_ns)
+
+    def read_bytes(self, path: str) -> bytes:
+        """Get a file's contents"""
+        with self.open(path, "rb") as f:
+            return f.read()
+
+    def listdir(self, path: str) -> List[str]:
+        """Names in a directory"""
+        with self.scandir(path) as entries:
+            return [entry.name for entry in entries]
+
+    def exists(self, path: str) -> bool:
+        path = self._norm(path)
+        with self._lock:
+            return path in self._files or path in self._dirs
+
+    def isdir(self, path: str) -> bool:
+        path = self._norm(path)
+        with self._lock:
+            return path in self._dirs
+
+    def islink(self, path: str) -> bool:
+        return False
+
+    def stat(self, path: str) -> MemoryStat:
+        path = self._norm(path)
+        with self._lock:
+            file = self._files.get(path)
+            if file is not None:
+                return MemoryStat(len(file.data), file.mtime_ns)
+            if path in self._dirs:
+                return MemoryStat(0, 0, is_dir=True)
+        raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+
+    def getsize(self, path: str) -> int:
+        return self.stat(path).st_size
+
+    def scandir(self, path: str):
+        """Entries of a directory, listed when called; usable as a context manager"""
+        path = self._norm(path)
+        with self._lock:
+            children = self._dirs.get(path)
+            if children is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+            entries = [MemoryDirEntry(path, name, is_dir) for name, is_dir in children.items()]
+        return nullcontext(iter(entries))
+
+    def makedirs(self, path: str) -> None:
+        path = self._norm(path)
+        with self._lock:
+            missing = []
+            while path not in self._dirs:
+                if path in self._files:
+                    raise FileExistsError(errno.EEXIST, "File exists", path)
+                if os.path.dirname(path) == path:
+                    # Another drive's root
+                    self._dirs[path] = {}
+                    break
+                missing.append(path)
+                path = os.path.dirname(path)
+            for directory in reversed(missing):
+                self._dirs[os.path.dirname(directory)][os.path.basename(directory)] = True
+                self._dirs[directory] = {}
+
+    def open(self, path: str, mode: str = "rb") -> _MemoryHandle:
+        path = self._norm(path)
+        if "b" not in mode:
+            raise ValueError("MemoryFileSystem only supports binary modes")
+        with self._lock:
+            if path in self._dirs:
+                raise IsADirectoryError(errno.EISDIR, "Is a directory", path)
+            file = self._files.get(path)
+            if mode.startswith("r"):
+                if file is None:
+                    raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+                data = file.data
+            else:
+                if mode.startswith("x") and file is not None:
+                    raise FileExistsError(errno.EEXIST, "File exists", path)
+                self._parent(path)
+                data = file.data if (file is not None and mode.startswith("a")) else b""
+        handle = _MemoryHandle(self, path, data, writable=not mode.startswith("r") or "+" in mode)
+        if mode.startswith("a"):
+            handle.seek(0, io.SEEK_END)
+        elif not mode.startswith("r"):
+            # Creating or truncating happens on open, as on disk
+            handle.flush()
+        return handle
+
+    def fsync(self, handle) -> None:
+        handle.flush()
+
+    def copystat(self, source: str, target: str) -> None:
+        source, target = self._norm(source), self._norm(target)
+        with self._lock:
+            if source not in self._files or target not in self._files:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", source)
+            self._files[target].mtime_ns = self._files[source].mtime_ns
+
+    def rename(self, source: str, target: str) -> None:
+        source, target = self._norm(source), self._norm(target)
+        if self._device(source) != self._device(target):
+            raise OSError(errno.EXDEV, "Invalid cross-device link", source)
+        with self._lock:
+            file = self._files.get(source)
+            if file is None:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", source)
+            if target in self._dirs:
+                raise IsADirectoryError(errno.EISDIR, "Is a directory", target)
+            self._parent(target)[os.path.basename(target)] = False
+            del self._parent(source)[os.path.basename(source)]
+            self._files[target] = self._files.pop(source)
+
+    replace = rename
+
+    def move(self, source: str, target: str) -> None:
+        """Rename, or copy and delete across devices"""
+        try:
+            self.rename(source, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            self._store(self._norm(target), self.read_bytes(source))
+            self.copystat(source, target)
+            self.unlink(source)
+
+    def unlink(self, path: str) -> None:
+        path = self._norm(path)
+        with self._lock:
+            if path not in self._files:
+                raise FileNotFoundError(errno.ENOENT, "No such file or directory", path)
+            del self._files[path]
+            del self._parent(path)[os.path.basename(path)]
+
+
+class _SlowHandle:
+    """Wraps an open file, delaying reads and writes"""
+
+    def __init__(self, fs: "SlowFileSystem", handle, path: str):
+        self._fs = fs
+        self._handle = handle
+        self._path = path
+
+    def readinto(self, buffer) -> int:
+        self._fs._before("read", self._path)
+        return self._handle.readinto(buffer)
+
+    def read(self, size: int = -1) -> bytes:
+        self._fs._before("read", self._path)
+        return self._handle.read(size)
+
+    def write(self, data) -> int:
+        self._fs._before("write", self._path)
+        return self._handle.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._handle, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._handle.close()
+
+
+class SlowFileSystem:
+    """Wraps another filesystem with per-operation latency and injected failures
+
+    latency applies to every operation unless delays (seconds keyed by
+    operation name, e.g. {"rename": 0.002, "read": 0.001}) says otherwise.
+    Failures come from rules added with fail(), and from error_rate, the
+    chance that a FILE_OPS operation raises a permission or file-in-use
+    error. Every operation is counted in calls.
+    """
+
+    FILE_OPS = ("open", "rename", "replace", "move", "unlink")
+
+    def __init__(self, base=None, latency: float = 0.0, delays: Optional[Dict[str, float]] = None,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        """Initialize SlowFileSystem around base (default: a new MemoryFileSystem)"""
+        self.base = base if base is not None else MemoryFileSystem()
+        self.latency = latency
+        self.delays = dict(delays or {})
+        self.error_rate = error_rate
+        self.calls: Counter = Counter()
+        self._rules: List[Dict] = []
+        self._lock = threading.Lock()
+        # Imported here, like fnmatch below, to keep Scanner and Mover fast to import
+        import random
+        self._random = random.Random(seed)
+
+    def fail(self, pattern: str, error: Callable[[str], BaseException] = permission_error,
+             ops: Iterable[str] = FILE_OPS, times: Optional[int] = None, after: int = 0) -> None:
+        """Raise error(path) for operations in ops on paths matching a glob pattern
+
+        The first after matching operations succeed, e.g. to break a copy
+        part way through. times limits how often the rule fires, for
+        transient failures such as a file that is only locked for a moment.
+        """
+        import fnmatch
+        import re
+        regex = re.compile(fnmatch.translate(pattern))
+        with self._lock:
+            self._rules.append({"regex": regex, "error": error, "ops": set(ops),
+                                "times": times, "after": after})
+
+    def _before(self, op: str, path: str) -> None:
+        """Count, delay and possibly fail one operation"""
+        error = None
+        with self._lock:
+            self.calls[op] += 1
+            for rule in self._rules:
+                if op in rule["ops"] and rule["times"] != 0 and rule["regex"].match(path):
+                    if rule["after"]:
+                        rule["after"] -= 1
+                        continue
+                    if rule["times"] is not None:
+                        rule["times"] -= 1
+                    error = rule["error"](path)
+                    break
+            if error is None and self.error_rate and op in self.FILE_OPS:
+                if self._random.random() < self.error_rate:
+                    error = self._random.choice((permission_error, file_in_use_error))(path)
+
+        delay = self.delays.get(op, self.latency)
+        if delay:
+            time.sleep(delay)
+        if error is not None:
+            raise error
+
+    def __getattr__(self, name):
+        # Helpers of the wrapped filesystem, such as add_file, pass straight through
+        return getattr(self.base, name)
+
+    def exists(self, path: str) -> bool:
+        self._before("exists", path)
+        return self.base.exists(path)
+
+    def isdir(self, path: str) -> bool:
+        self._before("isdir", path)
+        return self.base.isdir(path)
+
+    def islink(self, path: str) -> bool:
+        self._before("islink", path)
+        return self.base.islink(path)
+
+    def stat(self, path: str):
+        self._before("stat", path)
+        return self.base.stat(path)
+
+    def getsize(self, path: str) -> int:
+        self._before("stat", path)
+        return self.base.getsize(path)
+
+    def scandir(self, path: str):
+        self._before("scandir", path)
+        return self.base.scandir(path)
+
+    def makedirs(self, path: str) -> None:
+        self._before("makedirs", path)
+        self.base.makedirs(path)
+
+    def open(self, path: str, mode: str = "rb") -> _SlowHandle:
+        self._before("open", path)
+        return _SlowHandle(self, self.base.open(path, mode), path)
+
+    def fsync(self, handle) -> None:
+        self._before("fsync", handle._path)
+        self.base.fsync(handle._handle)
+
+    def copystat(self, source: str, target: str) -> None:
+        self._before("copystat", target)
+        self.base.copystat(source, target)
+
+    def rename(self, source: str, target: str) -> None:
+        self._before("rename", source)
+        self.base.rename(source, target)
+
+    def replace(self, source: str, target: str) -> None:
+        self._before("replace", source)
+        self.base.replace(source, target)
+
+    def move(self, source: str, target: str) -> None:
+        self._before("move", source)
+        self.base.move(source, target)
+
+    def unlink(self, path: str) -> None:
+        self._before("unlink", path)
+        self.base.unlink(path)
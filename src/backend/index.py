@@ -0,0 +1,319 @@
+"""Metadata Index for AutoDeskCleaner"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Files that are never indexed (in-progress copies and their checkpoints)
+_SKIP_SUFFIXES = (".partial", ".partial.json", ".partial.json.tmp")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_mtime ON files (mtime);
+CREATE INDEX IF NOT EXISTS idx_files_category ON files (category, mtime);
+CREATE INDEX IF NOT EXISTS idx_files_extension ON files (extension, mtime);
+CREATE INDEX IF NOT EXISTS idx_files_size ON files (size);
+CREATE INDEX IF NOT EXISTS idx_files_source ON files (source);
+"""
+
+_FTS_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+    name, content='files', content_rowid='id', prefix='2 3'
+)
+"""
+
+# Keep the full-text index in sync with the files table
+_FTS_TRIGGERS = {
+    "files_ai": """
+        CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+            INSERT INTO files_fts (rowid, name) VALUES (new.id, new.name);
+        END""",
+    "files_ad": """
+        CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+            INSERT INTO files_fts (files_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END""",
+    "files_au": """
+        CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE ON files BEGIN
+            INSERT INTO files_fts (files_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO files_fts (rowid, name) VALUES (new.id, new.name);
+        END""",
+}
+
+_UPSERT = (
+    "INSERT INTO files (path, name, category, extension, size, mtime, source, indexed_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT(path) DO UPDATE SET name=excluded.name, category=excluded.category, "
+    "extension=excluded.extension, size=excluded.size, mtime=excluded.mtime, "
+    "source=CASE WHEN excluded.source != '' THEN excluded.source ELSE files.source END, "
+    "indexed_at=excluded.indexed_at"
+)
+
+_COLUMNS = ("path", "name", "category", "extension", "size", "mtime", "source")
+
+# Keyword filters accepted by MetadataIndex.search, as used in query strings
+SEARCH_FILTERS = ("category", "extension", "min_size", "max_size", "after", "before", "source", "limit")
+
+
+class MetadataIndex:
+    """SQLite index of organized files with full-text search on filenames"""
+
+    def __init__(self, db_path: str):
+        """Open (creating if needed) the index database at db_path"""
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        try:
+            conn.execute(_FTS_TABLE)
+            for statement in _FTS_TRIGGERS.values():
+                conn.execute(statement)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; name searches fall back to LIKE
+            self.has_fts = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # A larger page cache keeps index updates for big loads in memory
+            conn.execute("PRAGMA cache_size=-65536")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _record(path: str, category: str, source: str = "",
+                stat: Optional[os.stat_result] = None) -> Tuple:
+        stat = stat or os.stat(path)
+        name = os.path.basename(path)
+        extension = os.path.splitext(name)[1].lower()
+        return (path, name, category, extension, stat.st_size, stat.st_mtime, source, time.time())
+
+    def add(self, path: str, category: str, source: str = "") -> None:
+        """Index a file that has landed in the organized folder"""
+        self.add_many([self._record(path, category, source)])
+
+    def add_many(self, records: Iterable[Tuple], bulk: bool = False) -> int:
+        """
+        Insert or replace records from _record(); returns the number written
+        bulk skips per-row full-text updates and rebuilds the full-text index
+        once at the end, which is much faster for large loads
+        """
+        records = list(records)
+        if not records:
+            return 0
+        if bulk:
+            return self._bulk_load([records])
+        conn = self._connection()
+        with self._write_lock, conn:
+            conn.executemany(_UPSERT, records)
+        return len(records)
+    
+    def _bulk_load(self, batches: Iterable[List[Tuple]], prune_before: Optional[float] = None) -> int:
+        """
+        Load batches in one transaction with the full-text triggers suspended
+        prune_before drops rows not re-indexed since that time, i.e. files no
+        longer on disk; rows that were kept keep their recorded source
+        """
+        conn = self._connection()
+        total = 0
+        with self._write_lock, conn:
+            # Explicit BEGIN so the trigger changes roll back on failure
+            conn.execute("BEGIN")
+            if self.has_fts:
+                for name in _FTS_TRIGGERS:
+                    conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            for batch in batches:
+                conn.executemany(_UPSERT, batch)
+                total += len(batch)
+            if prune_before is not None:
+                conn.execute("DELETE FROM files WHERE indexed_at < ?", (prune_before,))
+            if self.has_fts:
+                conn.execute("INSERT INTO files_fts (files_fts) VALUES ('rebuild')")
+                for statement in _FTS_TRIGGERS.values():
+                    conn.execute(statement)
+        return total
+
+    def count(self) -> int:
+        """Number of indexed files"""
+        return self._connection().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def search(self, query: str = "", category: Optional[str] = None,
+               extension: Optional[str] = None, min_size: Optional[int] = None,
+               max_size: Optional[int] = None, after: Optional[str] = None,
+               before: Optional[str] = None, source: Optional[str] = None,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Find indexed files, newest first
+        query matches words or word prefixes in the filename; after/before
+        are YYYY-MM-DD modification dates; source is an original path prefix
+        """
+        clauses = []
+        params: List[Any] = []
+
+        query = query.strip()
+        if query:
+            if self.has_fts:
+                clauses.append("files.id IN (SELECT rowid FROM files_fts WHERE files_fts MATCH ?)")
+                params.append(self._fts_query(query))
+            else:
+                clauses.append("files.name LIKE ? ESCAPE '\\'")
+                params.append(f"%{self._like_escape(query)}%")
+        if category:
+            clauses.append("files.category = ?")
+            params.append(category)
+        if extension:
+            extension = extension.lower()
+            clauses.append("files.extension = ?")
+            params.append(extension if extension.startswith('.') else '.' + extension)
+        if min_size is not None:
+            clauses.append("files.size >= ?")
+            params.append(int(min_size))
+        if max_size is not None:
+            clauses.append("files.size <= ?")
+            params.append(int(max_size))
+        if after:
+            clauses.append("files.mtime >= ?")
+            params.append(self._parse_date(after))
+        if before:
+            clauses.append("files.mtime < ?")
+            params.append(self._parse_date(before))
+        if source:
+            # Range scan keeps the prefix match on the index
+            clauses.append("files.source >= ? AND files.source < ?")
+            params.extend([source, source + "\U0010ffff"])
+
+        sql = "SELECT " + ", ".join(f"files.{c}" for c in _COLUMNS) + " FROM files"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY files.mtime DESC LIMIT ?"
+        params.append(int(limit))
+
+        rows = self._connection().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """Turn free text into an FTS5 query of quoted prefix terms"""
+        terms = []
+        for word in query.replace('"', ' ').split():
+            terms.append(f'"{word}"*')
+        if not terms:
+            raise ValueError(f"Search query has no words to match: {query!r}")
+        return " ".join(terms)
+
+    @staticmethod
+    def _like_escape(query: str) -> str:
+        """Match %, _ and backslash literally in a LIKE pattern"""
+        return query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @staticmethod
+    def _parse_date(value: str) -> float:
+        return datetime.strptime(value, "%Y-%m-%d").timestamp()
+
+    def rebuild(self, target_base: str, workers: int = 4, batch_size: int = 10000) -> int:
+        """
+        Re-index every file under target_base, walking category folders in parallel
+        Files no longer on disk are dropped; original source paths are kept
+        """
+        import queue
+        from concurrent.futures import ThreadPoolExecutor
+
+        if not os.path.isdir(target_base):
+            return 0
+        started = time.time()
+
+        with os.scandir(target_base) as entries:
+            categories = [entry.name for entry in entries if entry.is_dir()]
+
+        # Walkers hand batches to this thread, which does all the writing
+        batches: queue.Queue = queue.Queue(maxsize=workers * 2)
+        finished = 0
+
+        def walk(category: str) -> None:
+            batch = []
+            try:
+                for record in self._walk_category(target_base, category):
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        batches.put(batch)
+                        batch = []
+                if batch:
+                    batches.put(batch)
+            finally:
+                batches.put(None)
+
+        def drain() -> Iterator[List[Tuple]]:
+            nonlocal finished
+            while finished < len(categories):
+                batch = batches.get()
+                if batch is None:
+                    finished += 1
+                else:
+                    yield batch
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index") as pool:
+            for category in categories:
+                pool.submit(walk, category)
+            try:
+                return self._bulk_load(drain(), prune_before=started)
+            finally:
+                # If loading stopped early, let blocked walkers finish
+                for _ in drain():
+                    pass
+
+    def _walk_category(self, target_base: str, category: str) -> Iterator[Tuple]:
+        for root, _, filenames in os.walk(os.path.join(target_base, category)):
+            for filename in filenames:
+                if filename.endswith(_SKIP_SUFFIXES):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    yield self._record(path, category, stat=os.stat(path))
+                except OSError:
+                    continue
+
+
+_shared_indexes: Dict[str, MetadataIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_index(db_path: Optional[str], target_base: Optional[str] = None) -> Optional[MetadataIndex]:
+    """Get the process-wide MetadataIndex for db_path, or None if indexing is off
+
+    If the database file does not exist yet and target_base is given, the
+    index is rebuilt from the files already on disk.
+    """
+    if not db_path:
+        return None
+    key = os.path.abspath(db_path)
+    with _shared_lock:
+        index = _shared_indexes.get(key)
+        if index is None:
+            missing = not os.path.exists(db_path)
+            index = MetadataIndex(db_path)
+            if missing and target_base:
+                index.rebuild(target_base)
+            _shared_indexes[key] = index
+        return index
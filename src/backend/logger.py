@@ -1,9 +1,13 @@
 """Logger for AutoDeskCleaner"""
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
+# Serializes appends to the log file across concurrent cleanups
+_write_lock = threading.Lock()
+
 
 class Logger:
     """Tracks and logs all file operations"""
@@ -48,8 +52,8 @@ class Logger:
         }
         self.log_operation(operation)
     
-    def log_success(self, source: str, destination: str, category: str) -> None:
-        """Log a successful file move"""
+    def log_success(self, source: str, destination: str, category: str, checksum: str = "") -> None:
+        """Log a successful file move, with the copy checksum if one was computed"""
         operation = {
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "source": source,
@@ -58,6 +62,8 @@ class Logger:
             "status": "success",
             "error": ""
         }
+        if checksum:
+            operation["checksum"] = checksum
         self.log_operation(operation)
     
     def log_skip(self, filepath: str, reason: str, category: str = "") -> None:
@@ -102,7 +108,7 @@ class Logger:
                 Path(log_dir).mkdir(parents=True, exist_ok=True)
             
             # Append to log file
-            with open(log_path, 'a', encoding='utf-8') as f:
+            with _write_lock, open(log_path, 'a', encoding='utf-8') as f:
                 f.write(f"\n{'='*60}\n")
                 f.write(f"Cleanup Session: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"{'='*60}\n\n")
@@ -114,6 +120,8 @@ class Logger:
                         f.write(f"  Destination: {op['destination']}\n")
                     if op['category']:
                         f.write(f"  Category: {op['category']}\n")
+                    if op.get('checksum'):
+                        f.write(f"  Checksum: {op['checksum']}\n")
                     if op['error']:
                         f.write(f"  Error: {op['error']}\n")
                     f.write("\n")
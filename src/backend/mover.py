@@ -1,17 +1,65 @@
 """File Mover for AutoDeskCleaner"""
+import errno
+import hashlib
+import json
 import os
-import shutil
+import threading
+import time
 from datetime import datetime
-from pathlib import Path
-from typing import Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from .fs import LOCAL
+
+if TYPE_CHECKING:
+    from .index import MetadataIndex
+    from .throttle import Throttle
+
+
+class ChecksumMismatchError(OSError):
+    """Raised when a copied file does not match the source checksum"""
 
 
 class Mover:
     """Handles file movement operations with error handling"""
     
-    def move_file(self, source: str, category: str, base_path: str) -> Tuple[bool, str, str]:
+    # Buffer size for cross-device copies
+    CHUNK_SIZE = 1024 * 1024
+    # Suffix of in-progress large file copies; a ".json" checkpoint sits beside it
+    PARTIAL_SUFFIX = ".partial"
+    MB = 1024 * 1024
+    
+    def __init__(self, throttle: Optional["Throttle"] = None, settings: Optional[Dict[str, Any]] = None,
+                 index: Optional["MetadataIndex"] = None, fs=None):
+        """Initialize Mover with an optional shared Throttle, transfer settings, metadata index and filesystem"""
+        self.throttle = throttle
+        self.index = index
+        self.fs = fs or LOCAL
+        settings = settings or {}
+        # Digest computed while copying across devices ("none" disables)
+        self.checksum = settings.get("checksum", "sha256")
+        # Re-read the destination and compare digests before deleting the source
+        self.verify = settings.get("verify", False)
+        # Cross-device copies at least this large are resumable and use their own lane
+        self.large_file_threshold = int(settings.get("large_file_threshold_mb", 256) * self.MB)
+        # Large copies are fsynced and checkpointed after this much data
+        self.checkpoint_bytes = int(settings.get("checkpoint_mb", 64) * self.MB)
+        self.workers = settings.get("workers", 4)
+        self.large_file_workers = settings.get("large_file_workers", 1)
+        
+        self._checksums: Dict[str, str] = {}
+        self._checksums_lock = threading.Lock()
+        self._reserved = set()
+        self._reserved_lock = threading.Lock()
+        # Category folders already created, so each move skips a makedirs round trip
+        self._created_dirs = set()
+        # Per target folder: source -> target of interrupted large copies
+        self._partials: Dict[str, Dict[str, str]] = {}
+        self._partials_lock = threading.Lock()
+    
+    def move_file(self, source: str, category: str, base_path: str,
+                  large: Optional[bool] = None) -> Tuple[bool, str, str]:
         """
-        Move file to categorized folder
+        Move file to categorized folder; large skips the size check if already known
         Returns: (success, destination_path, error_message)
         """
         try:
@@ -23,15 +71,32 @@ class Mover:
             # Get filename and construct target path
             filename = os.path.basename(source)
             target_path = os.path.join(target_dir, filename)
+            # An interrupted large copy resumes under the name it started with,
+            # even if that was a duplicate-suffixed one; only large files can
+            # have one, so small moves never list the target folder
+            if large is None:
+                large = self.is_large_file(source)
+            if large:
+                target_path = self.partial_targets(target_dir).get(os.path.abspath(source), target_path)
             
             # Handle duplicates
-            if os.path.exists(target_path):
-                target_path = self.handle_duplicate(target_path)
+            target_path = self.reserve_target(target_path)
             
             # Move the file
-            shutil.move(source, target_path)
+            try:
+                if self.throttle is not None:
+                    self.throttle.acquire_file()
+                self.transfer(source, target_path)
+            finally:
+                with self._reserved_lock:
+                    self._reserved.discard(target_path)
+            
+            if self.index is not None:
+                self.index_file(target_path, category, source)
             return True, target_path, ""
         
+        except ChecksumMismatchError as e:
+            return False, "", f"Verification failed: {str(e)}"
         except PermissionError as e:
             return False, "", f"Permission denied: {str(e)}"
         except OSError as e:
@@ -41,10 +106,410 @@ class Mover:
         except Exception as e:
             return False, "", f"Unexpected error: {str(e)}"
     
+    def move_files(self, items: Iterable[Tuple[str, str]], base_path: str,
+                   on_abandoned: Optional[Callable[..., Any]] = None) -> Iterator[Tuple[str, str, bool, str, str]]:
+        """
+        Move (source, category) pairs concurrently, large files on their own lane
+        Yields: (source, category, success, destination_path, error_message) as moves finish
+        If the generator is closed early, on_abandoned is called with the same
+        fields for each move that finished but was never yielded
+        """
+        # Imported here to keep single-file and dry runs fast to start
+        import queue
+        from concurrent.futures import Future, ThreadPoolExecutor
+        
+        small_lane = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="move")
+        large_lane = ThreadPoolExecutor(max_workers=self.large_file_workers, thread_name_prefix="move-large")
+        completed: queue.Queue = queue.Queue()
+        closed = threading.Event()
+        submitted = []
+        futures = {}
+        try:
+            # Every file starts on the small lane, which checks its size; on
+            # slow storage that stat would serialize submission if done here
+            for source, category in items:
+                future = small_lane.submit(self._route, source, category, base_path, large_lane, closed)
+                futures[future] = (source, category)
+                submitted.append(future)
+                future.add_done_callback(completed.put)
+            
+            remaining = len(futures)
+            while remaining:
+                future = completed.get()
+                source, category = futures.pop(future)
+                result = future.result()
+                if isinstance(result, Future):
+                    # Handed to the large-file lane; wait for that instead
+                    futures[result] = (source, category)
+                    result.add_done_callback(completed.put)
+                    continue
+                remaining -= 1
+                success, destination, error = result
+                yield source, category, success, destination, error
+        finally:
+            # If the consumer stopped early, nothing will log further results,
+            # so files that have not started moving must stay where they are
+            # (cancel_futures on shutdown needs Python 3.9)
+            closed.set()
+            for future in submitted:
+                future.cancel()
+            small_lane.shutdown(wait=True)
+            for future in submitted:
+                if not future.cancelled() and isinstance(future.result(), Future):
+                    future.result().cancel()
+            large_lane.shutdown(wait=True)
+            
+            if on_abandoned is not None:
+                for future, (source, category) in futures.items():
+                    if future.cancelled():
+                        continue
+                    result = future.result()
+                    if isinstance(result, Future):
+                        if result.cancelled():
+                            continue
+                        result = result.result()
+                    if result is not None:
+                        on_abandoned(source, category, *result)
+    
+    def _route(self, source: str, category: str, base_path: str, large_lane, closed: threading.Event):
+        """Move a small file, or hand a large one to the large-file lane and return its future"""
+        if closed.is_set():
+            # Not started: reported to nobody, and the file stays put
+            return None
+        if self.is_large_file(source):
+            return large_lane.submit(self.move_file, source, category, base_path, True)
+        return self.move_file(source, category, base_path, False)
+    
+    def index_file(self, target_path: str, category: str, source: str) -> None:
+        """Record a moved file in the metadata index"""
+        import sqlite3
+        try:
+            self.index.add(target_path, category, os.path.abspath(source))
+        except (sqlite3.Error, OSError):
+            # The move itself succeeded; the index can be rebuilt from disk
+            pass
+    
+    def partial_targets(self, target_dir: str) -> Dict[str, str]:
+        """
+        Map sources of interrupted large copies into target_dir to their targets
+        Checkpoints are read once per folder; those whose source is gone are
+        removed along with their partial file.
+        """
+        with self._partials_lock:
+            targets = self._partials.get(target_dir)
+            if targets is not None:
+                return targets
+            targets = self._partials[target_dir] = {}
+            
+            suffix = self.PARTIAL_SUFFIX + ".json"
+            try:
+                with self.fs.scandir(target_dir) as entries:
+                    names = [entry.name for entry in entries if entry.name.endswith(suffix)]
+            except OSError:
+                return targets
+            
+            for name in names:
+                checkpoint_path = os.path.join(target_dir, name)
+                partial_path = checkpoint_path[:-len(".json")]
+                try:
+                    with self.fs.open(checkpoint_path, 'rb') as f:
+                        checkpoint = json.load(f)
+                    source = checkpoint.get("source") if isinstance(checkpoint, dict) else None
+                    if not source:
+                        continue
+                    if self.fs.exists(source):
+                        targets[source] = partial_path[:-len(self.PARTIAL_SUFFIX)]
+                    else:
+                        # Moved or deleted since; there is nothing left to resume
+                        self._discard_partial(partial_path, checkpoint_path)
+                except (OSError, ValueError):
+                    continue
+            return targets
+    
+    def is_large_file(self, source: str) -> bool:
+        """Check if a file goes through the large-file path"""
+        try:
+            return self.fs.getsize(source) >= self.large_file_threshold
+        except OSError:
+            return False
+    
+    def reserve_target(self, target_path: str) -> str:
+        """Pick a free target path that no concurrent move is using, and claim it"""
+        candidate = target_path
+        name = ext = None
+        counter = 0
+        while True:
+            with self._reserved_lock:
+                claimed = candidate not in self._reserved
+                if claimed:
+                    self._reserved.add(candidate)
+            
+            # Checked after claiming, outside the lock, so slow storage does not
+            # serialize moves; no other move can create a claimed path meanwhile
+            if claimed:
+                if not self.fs.exists(candidate):
+                    return candidate
+                with self._reserved_lock:
+                    self._reserved.discard(candidate)
+            
+            if name is None:
+                candidate = self.handle_duplicate(target_path)
+                name, ext = os.path.splitext(candidate)
+            else:
+                counter += 1
+                candidate = f"{name}_{counter}{ext}"
+    
+    def transfer(self, source: str, target_path: str) -> None:
+        """Move source to target_path by renaming, or copying across devices"""
+        try:
+            self.fs.rename(source, target_path)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+        
+        # Symlinks are recreated rather than copied
+        if self.fs.islink(source):
+            self.fs.move(source, target_path)
+            return
+        
+        copy = self.copy_large_file if self.is_large_file(source) else self.copy_file
+        if self.throttle is not None:
+            with self.throttle.copy_slot():
+                digest = copy(source, target_path)
+        else:
+            digest = copy(source, target_path)
+        
+        if digest:
+            with self._checksums_lock:
+                self._checksums[target_path] = digest
+        self.fs.unlink(source)
+    
+    def pop_checksum(self, target_path: str) -> str:
+        """Get and forget the digest recorded for a copied file ("" if none)"""
+        with self._checksums_lock:
+            return self._checksums.pop(target_path, "")
+    
+    def _new_hasher(self, algorithm: Optional[str] = None):
+        algorithm = algorithm or self.checksum
+        if not algorithm or algorithm == "none":
+            return None
+        return hashlib.new(algorithm)
+    
+    def copy_file(self, source: str, target_path: str) -> str:
+        """
+        Copy file contents in chunks, honoring the byte rate limit, then metadata
+        Returns: "algorithm:hexdigest" of the copied data, or "" if disabled
+        """
+        buffer = bytearray(self.CHUNK_SIZE)
+        view = memoryview(buffer)
+        hasher = self._new_hasher()
+        # Verifying needs a digest even when checksums are not reported
+        algorithm = "sha256" if hasher is None and self.verify else None
+        if algorithm:
+            hasher = self._new_hasher(algorithm)
+        
+        try:
+            with self.fs.open(source, 'rb') as src, self.fs.open(target_path, 'wb') as dst:
+                while True:
+                    start = time.perf_counter()
+                    size = src.readinto(buffer)
+                    io_time = time.perf_counter() - start
+                    if not size:
+                        break
+                    
+                    if self.throttle is not None:
+                        self.throttle.acquire_bytes(size)
+                    
+                    # Hash the same buffer that is written, in the same pass
+                    chunk = view[:size]
+                    if hasher is not None:
+                        hasher.update(chunk)
+                    
+                    start = time.perf_counter()
+                    dst.write(chunk)
+                    # Report I/O time only, so throttle waits don't look like slowness
+                    if self.throttle is not None:
+                        self.throttle.record_latency(io_time + time.perf_counter() - start, size)
+                # Make the copy durable before it is verified and the source deleted
+                dst.flush()
+                self.fs.fsync(dst)
+            self.fs.copystat(source, target_path)
+            
+            if hasher is not None and self.verify:
+                self.verify_copy(target_path, hasher.hexdigest(), view, algorithm)
+        except BaseException:
+            # Never leave a truncated or corrupt copy behind
+            if self.fs.exists(target_path):
+                self.fs.unlink(target_path)
+            raise
+        
+        if hasher is None or algorithm:
+            return ""
+        return f"{hasher.name}:{hasher.hexdigest()}"
+    
+    def copy_large_file(self, source: str, target_path: str) -> str:
+        """
+        Copy a large file through a resumable ".partial" file
+        Returns: "algorithm:hexdigest" of the copied data, or "" if disabled
+        
+        Every checkpoint_bytes the partial file is fsynced and its offset and
+        running digest are saved. After an interruption the next attempt
+        re-hashes the partial file up to that offset and, if it matches,
+        continues copying from there instead of starting over.
+        """
+        partial_path = target_path + self.PARTIAL_SUFFIX
+        checkpoint_path = partial_path + ".json"
+        # Resuming needs a digest even when checksums are not reported
+        algorithm = self.checksum if self.checksum and self.checksum != "none" else "sha256"
+        source_stat = self.fs.stat(source)
+        
+        buffer = bytearray(self.CHUNK_SIZE)
+        view = memoryview(buffer)
+        offset, hasher = self._resume_offset(source, source_stat, partial_path, checkpoint_path, algorithm, view)
+        unsaved = 0
+        checkpoint = {
+            "source": os.path.abspath(source),
+            "size": source_stat.st_size,
+            "mtime_ns": source_stat.st_mtime_ns,
+            "algorithm": algorithm,
+            "offset": offset,
+            "digest": hasher.hexdigest()
+        }
+        if not offset:
+            # Written before any data, so every partial file names its source
+            self._write_checkpoint(checkpoint_path, checkpoint)
+        targets = self.partial_targets(os.path.dirname(target_path))
+        with self._partials_lock:
+            targets[checkpoint["source"]] = target_path
+        
+        with self.fs.open(source, 'rb') as src, self.fs.open(partial_path, 'r+b' if offset else 'wb') as dst:
+            src.seek(offset)
+            dst.seek(offset)
+            dst.truncate()
+            while True:
+                start = time.perf_counter()
+                size = src.readinto(buffer)
+                io_time = time.perf_counter() - start
+                if not size:
+                    break
+                
+                if self.throttle is not None:
+                    self.throttle.acquire_bytes(size)
+                
+                chunk = view[:size]
+                hasher.update(chunk)
+                start = time.perf_counter()
+                dst.write(chunk)
+                if self.throttle is not None:
+                    self.throttle.record_latency(io_time + time.perf_counter() - start, size)
+                offset += size
+                unsaved += size
+                
+                if unsaved >= self.checkpoint_bytes:
+                    dst.flush()
+                    self.fs.fsync(dst)
+                    checkpoint.update(offset=offset, digest=hasher.hexdigest())
+                    self._write_checkpoint(checkpoint_path, checkpoint)
+                    unsaved = 0
+            # The final segment too, before the source can be deleted
+            dst.flush()
+            self.fs.fsync(dst)
+        
+        digest = hasher.hexdigest()
+        try:
+            if self.verify:
+                self.verify_copy(partial_path, digest, view, algorithm)
+        except ChecksumMismatchError:
+            self._discard_partial(partial_path, checkpoint_path)
+            raise
+        
+        self.fs.copystat(source, partial_path)
+        self.fs.replace(partial_path, target_path)
+        if self.fs.exists(checkpoint_path):
+            self.fs.unlink(checkpoint_path)
+        with self._partials_lock:
+            targets.pop(checkpoint["source"], None)
+        
+        if self._new_hasher() is None:
+            return ""
+        return f"{algorithm}:{digest}"
+    
+    def _resume_offset(self, source: str, source_stat, partial_path: str,
+                       checkpoint_path: str, algorithm: str, view: memoryview):
+        """Get (offset, hasher) to continue a partial copy from, or (0, fresh hasher)"""
+        fresh = (0, hashlib.new(algorithm))
+        if not (self.fs.exists(partial_path) and self.fs.exists(checkpoint_path)):
+            return fresh
+        
+        try:
+            with self.fs.open(checkpoint_path, 'rb') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return fresh
+        
+        # The source must be the same, unchanged file
+        if (checkpoint.get("source") != os.path.abspath(source)
+                or checkpoint.get("size") != source_stat.st_size
+                or checkpoint.get("mtime_ns") != source_stat.st_mtime_ns
+                or checkpoint.get("algorithm") != algorithm):
+            return fresh
+        
+        offset = checkpoint.get("offset", 0)
+        if self.fs.getsize(partial_path) < offset:
+            return fresh
+        
+        hasher = hashlib.new(algorithm)
+        remaining = offset
+        with self.fs.open(partial_path, 'rb') as f:
+            while remaining:
+                size = f.readinto(view[:min(remaining, len(view))])
+                if not size:
+                    return fresh
+                hasher.update(view[:size])
+                remaining -= size
+        
+        if hasher.hexdigest() != checkpoint.get("digest"):
+            return fresh
+        return offset, hasher
+    
+    def _write_checkpoint(self, checkpoint_path: str, checkpoint: Dict[str, Any]) -> None:
+        tmp_path = checkpoint_path + ".tmp"
+        with self.fs.open(tmp_path, 'wb') as f:
+            f.write(json.dumps(checkpoint).encode('utf-8'))
+        self.fs.replace(tmp_path, checkpoint_path)
+    
+    def _discard_partial(self, partial_path: str, checkpoint_path: str) -> None:
+        for path in (partial_path, checkpoint_path):
+            if self.fs.exists(path):
+                self.fs.unlink(path)
+    
+    def verify_copy(self, target_path: str, expected: str, view: Optional[memoryview] = None,
+                    algorithm: Optional[str] = None) -> None:
+        """Re-read target_path and raise ChecksumMismatchError if it differs from expected"""
+        if view is None:
+            view = memoryview(bytearray(self.CHUNK_SIZE))
+        hasher = self._new_hasher(algorithm)
+        
+        with self.fs.open(target_path, 'rb') as f:
+            while True:
+                size = f.readinto(view)
+                if not size:
+                    break
+                hasher.update(view[:size])
+        
+        if hasher.hexdigest() != expected:
+            raise ChecksumMismatchError(
+                f"{target_path}: expected {hasher.name} {expected}, got {hasher.hexdigest()}"
+            )
+    
     def create_target_directory(self, directory_path: str) -> bool:
         """Create target directory if it doesn't exist"""
+        if directory_path in self._created_dirs:
+            return True
         try:
-            Path(directory_path).mkdir(parents=True, exist_ok=True)
+            self.fs.makedirs(directory_path)
+            self._created_dirs.add(directory_path)
             return True
         except PermissionError:
             return False
@@ -0,0 +1,392 @@
+"""Perceptual Image Hashing for AutoDeskCleaner
+
+Finds near-duplicate images (resized, re-encoded or lightly edited copies)
+with a 64-bit difference hash (dHash) and a BK-tree over Hamming distance.
+
+Images are decoded with Pillow when it is installed; otherwise a pure-Python
+decoder handles PNG and uncompressed BMP files up to FALLBACK_MAX_PIXELS.
+Hashing runs in batches on a shared process pool, using NumPy for the
+downscale and bit packing when available.
+"""
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# dHash compares horizontally adjacent pixels of a 9x8 thumbnail
+HASH_WIDTH = 9
+HASH_HEIGHT = 8
+
+# The pure-Python decoder takes about a second per megapixel
+FALLBACK_MAX_PIXELS = 4_000_000
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+
+def _gray_row(line: bytes, color_type: int, palette_gray: Optional[List[int]]) -> List[int]:
+    """Convert one unfiltered PNG scanline to 8-bit luma values"""
+    if color_type == 0:
+        return list(line)
+    if color_type == 4:
+        return list(line[0::2])
+    if color_type == 3:
+        return [palette_gray[i] for i in line]
+    step = 3 if color_type == 2 else 4
+    return [
+        (299 * r + 587 * g + 114 * b) // 1000
+        for r, g, b in zip(line[0::step], line[1::step], line[2::step])
+    ]
+
+
+def _unfilter(line: bytearray, prev: bytearray, filter_type: int, bpp: int) -> None:
+    """Reverse a PNG scanline filter in place"""
+    n = len(line)
+    if filter_type == 1:
+        for i in range(bpp, n):
+            line[i] = (line[i] + line[i - bpp]) & 0xFF
+    elif filter_type == 2:
+        for i in range(n):
+            line[i] = (line[i] + prev[i]) & 0xFF
+    elif filter_type == 3:
+        for i in range(n):
+            left = line[i - bpp] if i >= bpp else 0
+            line[i] = (line[i] + ((left + prev[i]) >> 1)) & 0xFF
+    elif filter_type == 4:
+        for i in range(n):
+            a = line[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            c = prev[i - bpp] if i >= bpp else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            if pa <= pb and pa <= pc:
+                predictor = a
+            elif pb <= pc:
+                predictor = b
+            else:
+                predictor = c
+            line[i] = (line[i] + predictor) & 0xFF
+    elif filter_type != 0:
+        raise ValueError(f"Unknown PNG filter type {filter_type}")
+
+
+def decode_png(data: bytes, max_pixels: Optional[int] = None) -> Optional[Tuple[int, int, List[int]]]:
+    """Decode an 8-bit, non-interlaced PNG to (width, height, grayscale pixels)"""
+    if not data.startswith(_PNG_SIGNATURE):
+        return None
+
+    pos = len(_PNG_SIGNATURE)
+    header = None
+    palette = None
+    idat = []
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"PLTE":
+            palette = chunk
+        elif chunk_type == b"IDAT":
+            idat.append(chunk)
+        elif chunk_type == b"IEND":
+            break
+
+    if header is None:
+        return None
+    width, height, depth, color_type, _, _, interlace = header
+    channels = _PNG_CHANNELS.get(color_type)
+    if depth != 8 or interlace or channels is None or (color_type == 3 and not palette):
+        return None
+    if max_pixels and width * height > max_pixels:
+        return None
+
+    palette_gray = None
+    if color_type == 3:
+        palette_gray = [
+            (299 * palette[i] + 587 * palette[i + 1] + 114 * palette[i + 2]) // 1000
+            for i in range(0, len(palette) - 2, 3)
+        ]
+
+    stride = width * channels
+    # Never inflate more than the header's image size, so a small file
+    # cannot expand into gigabytes
+    expected = height * (stride + 1)
+    inflater = zlib.decompressobj()
+    raw = inflater.decompress(b"".join(idat), expected)
+    if inflater.unconsumed_tail or len(raw) < expected:
+        return None
+    prev = bytearray(stride)
+    pixels: List[int] = []
+    for y in range(height):
+        start = y * (stride + 1)
+        line = bytearray(raw[start + 1:start + 1 + stride])
+        _unfilter(line, prev, raw[start], channels)
+        pixels.extend(_gray_row(line, color_type, palette_gray))
+        prev = line
+    return width, height, pixels
+
+
+def decode_bmp(data: bytes, max_pixels: Optional[int] = None) -> Optional[Tuple[int, int, List[int]]]:
+    """Decode an uncompressed 24/32-bit BMP to (width, height, grayscale pixels)"""
+    if len(data) < 54 or data[:2] != b"BM":
+        return None
+    offset = struct.unpack_from("<I", data, 10)[0]
+    width, height = struct.unpack_from("<ii", data, 18)
+    bits, compression = struct.unpack_from("<HI", data, 28)
+    if compression != 0 or bits not in (24, 32) or width <= 0 or height == 0:
+        return None
+    if max_pixels and width * abs(height) > max_pixels:
+        return None
+
+    bpp = bits // 8
+    stride = (width * bpp + 3) & ~3
+    top_down = height < 0
+    height = abs(height)
+    pixels: List[int] = []
+    for row in range(height):
+        y = row if top_down else height - 1 - row
+        start = offset + y * stride
+        line = data[start:start + width * bpp]
+        pixels.extend(
+            (299 * r + 587 * g + 114 * b) // 1000
+            for b, g, r in zip(line[0::bpp], line[1::bpp], line[2::bpp])
+        )
+    return width, height, pixels
+
+
+def load_thumbnail(path: str) -> Optional[List[float]]:
+    """Decode an image and shrink it to HASH_HEIGHT x HASH_WIDTH grayscale values"""
+    if Image is not None:
+        try:
+            with Image.open(path) as img:
+                # Let JPEG decode at reduced size instead of full resolution
+                img.draft("L", (HASH_WIDTH * 8, HASH_HEIGHT * 8))
+                thumb = img.convert("L").resize((HASH_WIDTH, HASH_HEIGHT), Image.BOX)
+                return [float(v) for v in thumb.getdata()]
+        except Exception:
+            # Pillow's format plugins raise assorted errors on malformed files
+            return None
+
+    try:
+        # Larger than any PNG or BMP within the pixel cap could be
+        if os.path.getsize(path) > FALLBACK_MAX_PIXELS * 4 + 65536:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        decoded = decode_png(data, FALLBACK_MAX_PIXELS) or decode_bmp(data, FALLBACK_MAX_PIXELS)
+    except (OSError, ValueError, IndexError, zlib.error, struct.error):
+        # Truncated pixel data or out-of-range palette indices
+        return None
+    if decoded is None:
+        return None
+    width, height, pixels = decoded
+    if width <= 0 or height <= 0 or len(pixels) != width * height:
+        return None
+    return downscale(width, height, pixels)
+
+
+def downscale(width: int, height: int, pixels: Sequence[int]) -> List[float]:
+    """Box-average a grayscale image down to HASH_HEIGHT x HASH_WIDTH"""
+    if np is not None:
+        image = np.asarray(pixels, dtype=np.float64).reshape(height, width)
+        # Repeat pixels of tiny images so every output cell gets at least one
+        image = np.repeat(image, -(-HASH_HEIGHT // height), axis=0)
+        image = np.repeat(image, -(-HASH_WIDTH // width), axis=1)
+        rows, cols = image.shape
+        row_edges = np.arange(HASH_HEIGHT) * rows // HASH_HEIGHT
+        col_edges = np.arange(HASH_WIDTH) * cols // HASH_WIDTH
+        sums = np.add.reduceat(np.add.reduceat(image, row_edges, axis=0), col_edges, axis=1)
+        counts = np.outer(
+            np.diff(np.append(row_edges, rows)), np.diff(np.append(col_edges, cols))
+        )
+        return (sums / counts).ravel().tolist()
+
+    sums = [[0.0] * HASH_WIDTH for _ in range(HASH_HEIGHT)]
+    counts = [[0] * HASH_WIDTH for _ in range(HASH_HEIGHT)]
+    col_bins = [x * HASH_WIDTH // width for x in range(width)]
+    for y in range(height):
+        by = y * HASH_HEIGHT // height
+        row_sums, row_counts = sums[by], counts[by]
+        for bx, value in zip(col_bins, pixels[y * width:(y + 1) * width]):
+            row_sums[bx] += value
+            row_counts[bx] += 1
+
+    thumbnail = []
+    for by in range(HASH_HEIGHT):
+        for bx in range(HASH_WIDTH):
+            if counts[by][bx]:
+                thumbnail.append(sums[by][bx] / counts[by][bx])
+            else:
+                # Tiny image: sample the nearest source pixel
+                x = min(width - 1, bx * width // HASH_WIDTH)
+                y = min(height - 1, by * height // HASH_HEIGHT)
+                thumbnail.append(float(pixels[y * width + x]))
+    return thumbnail
+
+
+def dhash_batch(thumbnails: List[List[float]]) -> List[int]:
+    """Compute 64-bit difference hashes for a batch of thumbnails"""
+    if not thumbnails:
+        return []
+    if np is not None:
+        grid = np.asarray(thumbnails, dtype=np.float64).reshape(-1, HASH_HEIGHT, HASH_WIDTH)
+        bits = grid[:, :, 1:] > grid[:, :, :-1]
+        packed = np.packbits(bits.reshape(len(thumbnails), -1), axis=1)
+        return [int.from_bytes(row.tobytes(), "big") for row in packed]
+
+    hashes = []
+    for thumbnail in thumbnails:
+        value = 0
+        for y in range(HASH_HEIGHT):
+            row = thumbnail[y * HASH_WIDTH:(y + 1) * HASH_WIDTH]
+            for left, right in zip(row, row[1:]):
+                value = (value << 1) | (right > left)
+        hashes.append(value)
+    return hashes
+
+
+def hash_batch(paths: List[str]) -> List[Tuple[str, Optional[int]]]:
+    """Hash a batch of image files; undecodable files get None"""
+    loaded = [(path, load_thumbnail(path)) for path in paths]
+    decoded = [(path, thumb) for path, thumb in loaded if thumb is not None]
+    hashes = dict(zip((path for path, _ in decoded), dhash_batch([t for _, t in decoded])))
+    return [(path, hashes.get(path)) for path in paths]
+
+
+_pools: Dict[int, Any] = {}
+_pools_lock = threading.Lock()
+
+
+def _process_pool(workers: int):
+    """Get the process-wide hashing pool with this many workers
+
+    Workers are spawned rather than forked, since forking a threaded server
+    copies locks other threads may be holding; the pool is reused, so the
+    spawn cost is paid once.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            pool = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return pool
+
+
+def hash_images(paths: Iterable[str], workers: Optional[int] = None,
+                batch_size: int = 32) -> Dict[str, int]:
+    """Hash image files on a process pool; returns {path: hash} for decodable images"""
+    paths = list(paths)
+    batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+
+    if len(batches) <= 1 or workers == 1:
+        results = [hash_batch(batch) for batch in batches]
+    else:
+        from concurrent.futures.process import BrokenProcessPool
+        workers = workers or os.cpu_count() or 1
+        pool = _process_pool(workers)
+        try:
+            results = list(pool.map(hash_batch, batches))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            with _pools_lock:
+                if _pools.get(workers) is pool:
+                    del _pools[workers]
+            raise
+
+    return {path: value for batch in results for path, value in batch if value is not None}
+
+
+class BKTree:
+    """BK-tree for finding hashes within a Hamming distance without comparing all pairs"""
+
+    def __init__(self):
+        """Initialize an empty tree"""
+        # Nodes are [hash, items, {distance: child}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item: Any) -> None:
+        """Insert an item under its hash"""
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, Any]]:
+        """Find (distance, item) pairs within max_distance of value"""
+        if self._root is None:
+            return []
+        results = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, item) for item in node[1])
+            # Triangle inequality: only these subtrees can hold matches
+            low, high = distance - max_distance, distance + max_distance
+            stack.extend(child for d, child in node[2].items() if low <= d <= high)
+        return results
+
+
+def group_similar(hashes: Dict[str, int], max_distance: int = 6) -> List[List[str]]:
+    """Group paths whose hashes are within max_distance of each other (transitively)"""
+    paths = sorted(hashes)
+    parent = list(range(len(paths)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tree = BKTree()
+    for i, path in enumerate(paths):
+        for _, j in tree.search(hashes[path], max_distance):
+            parent[find(i)] = find(j)
+        tree.add(hashes[path], i)
+
+    groups: Dict[int, List[str]] = {}
+    for i, path in enumerate(paths):
+        groups.setdefault(find(i), []).append(path)
+    return sorted((group for group in groups.values() if len(group) > 1), key=lambda g: g[0])
+
+
+def find_similar_images(paths: Iterable[str], max_distance: int = 6,
+                        workers: Optional[int] = None) -> List[List[str]]:
+    """Hash images and return groups of near-duplicates"""
+    return group_similar(hash_images(paths, workers), max_distance)
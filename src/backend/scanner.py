@@ -1,45 +1,47 @@
 """Desktop Scanner for AutoDeskCleaner"""
 import os
 from pathlib import Path
-from typing import List
+from typing import Iterator, List
+
+from .fs import LOCAL
 
 
 class Scanner:
     """Scans desktop directory and identifies files for processing"""
     
-    def __init__(self, system_files: List[str] = None):
-        """Initialize Scanner with system files to exclude"""
+    def __init__(self, system_files: List[str] = None, fs=None):
+        """Initialize Scanner with system files to exclude and the filesystem to scan"""
         self.system_files = system_files or ["desktop.ini", ".DS_Store", "thumbs.db", "Thumbs.db"]
+        self.fs = fs or LOCAL
     
     def scan_desktop(self, desktop_path: str) -> List[str]:
         """Scan desktop directory and return list of processable files"""
-        files = []
-        
-        if not os.path.exists(desktop_path):
+        return list(self.iter_desktop(desktop_path))
+    
+    def iter_desktop(self, desktop_path: str) -> Iterator[str]:
+        """Yield processable files from the desktop directory as they are found"""
+        if not self.fs.exists(desktop_path):
             raise FileNotFoundError(f"Desktop path does not exist: {desktop_path}")
         
         try:
-            for item in os.listdir(desktop_path):
-                item_path = os.path.join(desktop_path, item)
-                
-                # Skip directories
-                if os.path.isdir(item_path):
-                    continue
-                
-                # Skip hidden files
-                if self.is_hidden_file(item):
-                    continue
-                
-                # Skip system files
-                if self.is_system_file(item):
-                    continue
-                
-                files.append(item_path)
+            with self.fs.scandir(desktop_path) as entries:
+                for entry in entries:
+                    # Skip directories
+                    if entry.is_dir():
+                        continue
+                    
+                    # Skip hidden files
+                    if self.is_hidden_file(entry.name):
+                        continue
+                    
+                    # Skip system files
+                    if self.is_system_file(entry.name):
+                        continue
+                    
+                    yield os.path.join(desktop_path, entry.name)
         
         except PermissionError:
             raise PermissionError(f"Permission denied accessing: {desktop_path}")
-        
-        return files
     
     def is_system_file(self, filename: str) -> bool:
         """Check if file is a system file"""
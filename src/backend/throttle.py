@@ -0,0 +1,284 @@
+"""I/O Throttling for AutoDeskCleaner"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket; a rate of 0 means unlimited"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """Initialize TokenBucket with tokens per second and burst capacity"""
+        self._lock = threading.Lock()
+        self.rate = float(rate or 0)
+        # Default burst is one second worth of tokens, following the rate
+        self._fixed_capacity = capacity is not None
+        self.capacity = float(capacity if self._fixed_capacity else self.rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate"""
+        with self._lock:
+            self._refill()
+            self.rate = float(rate or 0)
+            if not self._fixed_capacity:
+                self.capacity = self.rate
+                self._tokens = min(self._tokens, self.capacity)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Take tokens, sleeping until they are available; returns seconds waited"""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            self._refill()
+            # Requests larger than the bucket go into debt instead of
+            # waiting forever; later callers pay the difference
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class ThrottleSchedule:
+    """Time-of-day windows that override the default limits"""
+
+    def __init__(self, windows: List[Dict]):
+        """Initialize with windows like {"start": "09:00", "end": "18:00", "bytes_per_sec": ...}"""
+        self.windows = [
+            (self._parse_time(w["start"]), self._parse_time(w["end"]), w)
+            for w in windows
+        ]
+
+    @staticmethod
+    def _parse_time(value: str) -> int:
+        """Convert HH:MM to minutes after midnight"""
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+
+    def limits_at(self, moment: datetime) -> Optional[Dict]:
+        """Get the window active at the given time, or None"""
+        minute = moment.hour * 60 + moment.minute
+        for start, end, window in self.windows:
+            if start <= end:
+                active = start <= minute < end
+            else:
+                # Window wraps past midnight, e.g. 22:00-06:00
+                active = minute >= start or minute < end
+            if active:
+                return window
+        return None
+
+
+class Throttle:
+    """Rate limits shared by all move workers
+
+    Limits bytes/sec and files/sec with token buckets and caps concurrent
+    cross-device copies. When adaptive, the effective rate backs off
+    multiplicatively while copy latency per megabyte is well above its
+    recent best and recovers additively once it settles. Without a
+    configured bytes_per_sec, backing off scales the throughput measured
+    while copies ran at full speed.
+    """
+
+    LATENCY_FACTOR = 2.0
+    BACKOFF = 0.7
+    RECOVERY_STEP = 0.05
+    MIN_SCALE = 0.1
+    EWMA_WEIGHT = 0.2
+    # Smaller reads and writes are dominated by per-call overhead
+    MIN_SAMPLE_BYTES = 256 * 1024
+    # Per-sample rise of the baseline, so a lasting change in the storage
+    # becomes the new normal instead of holding the rate down for good
+    BASELINE_DRIFT = 0.01
+    # Seconds of copying summed into one throughput measurement
+    RATE_WINDOW = 1.0
+
+    def __init__(self, bytes_per_sec: float = 0, files_per_sec: float = 0,
+                 max_concurrent_copies: int = 0, schedule: Optional[List[Dict]] = None,
+                 adaptive: bool = False, io_priority: str = "normal"):
+        """Initialize Throttle; zero values mean unlimited"""
+        self.bytes_per_sec = bytes_per_sec
+        self.files_per_sec = files_per_sec
+        self.schedule = ThrottleSchedule(schedule or [])
+        self.adaptive = adaptive
+        self.io_priority = io_priority
+
+        self.bytes_bucket = TokenBucket(bytes_per_sec)
+        self.files_bucket = TokenBucket(files_per_sec)
+        self._copy_slots = (
+            threading.BoundedSemaphore(max_concurrent_copies) if max_concurrent_copies else None
+        )
+
+        self._lock = threading.Lock()
+        self.scale = 1.0
+        self._latency_ewma: Optional[float] = None
+        self._latency_baseline: Optional[float] = None
+        self._measured_rate: Optional[float] = None
+        self._window_start: Optional[float] = None
+        self._window_bytes = 0
+        self.update_limits()
+
+    @classmethod
+    def from_config(cls, settings: Dict) -> "Throttle":
+        """Create a Throttle from the "throttle" configuration section"""
+        return cls(
+            bytes_per_sec=settings.get("bytes_per_sec", 0),
+            files_per_sec=settings.get("files_per_sec", 0),
+            max_concurrent_copies=settings.get("max_concurrent_copies", 0),
+            schedule=settings.get("schedule", []),
+            adaptive=settings.get("adaptive", False),
+            io_priority=settings.get("io_priority", "normal")
+        )
+
+    def current_limits(self) -> Dict[str, float]:
+        """Get the configured limits for now, before adaptive scaling"""
+        window = self.schedule.limits_at(datetime.now()) or {}
+        return {
+            "bytes_per_sec": window.get("bytes_per_sec", self.bytes_per_sec),
+            "files_per_sec": window.get("files_per_sec", self.files_per_sec)
+        }
+
+    def update_limits(self) -> None:
+        """Apply the schedule and adaptive scale to the token buckets"""
+        limits = self.current_limits()
+        with self._lock:
+            scale = self.scale
+            measured = self._measured_rate
+        bytes_per_sec = limits["bytes_per_sec"]
+        if not bytes_per_sec and scale < 1.0:
+            # No configured limit to scale; back off from the measured throughput
+            bytes_per_sec = measured or 0
+        self.bytes_bucket.set_rate(bytes_per_sec * scale)
+        self.files_bucket.set_rate(limits["files_per_sec"] * scale)
+
+    def acquire_file(self) -> float:
+        """Wait for permission to start moving one file"""
+        self.update_limits()
+        return self.files_bucket.acquire(1)
+
+    def acquire_bytes(self, amount: int) -> float:
+        """Wait for permission to transfer amount bytes"""
+        return self.bytes_bucket.acquire(amount)
+
+    @contextmanager
+    def copy_slot(self):
+        """Hold one of the limited cross-device copy slots"""
+        if self._copy_slots is None:
+            yield
+            return
+        with self._copy_slots:
+            yield
+
+    def record_latency(self, seconds: float, nbytes: int) -> None:
+        """Feed back the I/O time (excluding throttle waits) of one copied chunk"""
+        if not self.adaptive or nbytes < self.MIN_SAMPLE_BYTES:
+            return
+        per_mb = seconds * (1024 * 1024) / nbytes
+        with self._lock:
+            if self._latency_ewma is None:
+                self._latency_ewma = per_mb
+            else:
+                self._latency_ewma += self.EWMA_WEIGHT * (per_mb - self._latency_ewma)
+
+            if self._latency_baseline is None:
+                self._latency_baseline = self._latency_ewma
+            else:
+                self._latency_baseline = min(self._latency_ewma,
+                                             self._latency_baseline * (1 + self.BASELINE_DRIFT))
+
+            if self.scale == 1.0:
+                self._measure_rate(seconds, nbytes)
+            else:
+                self._window_start = None
+
+            if self._latency_ewma > self._latency_baseline * self.LATENCY_FACTOR:
+                if self._measured_rate is None:
+                    # Slowed down before a full window; use the best single-copy rate
+                    self._measured_rate = 1024 * 1024 / self._latency_baseline
+                self.scale = max(self.MIN_SCALE, self.scale * self.BACKOFF)
+            else:
+                self.scale = min(1.0, self.scale + self.RECOVERY_STEP)
+        self.update_limits()
+
+    def _measure_rate(self, seconds: float, nbytes: int) -> None:
+        """Track bytes/sec copied by all workers together; caller holds _lock"""
+        now = time.monotonic()
+        if self._window_start is None:
+            self._window_start = now - seconds
+            self._window_bytes = 0
+        self._window_bytes += nbytes
+        elapsed = now - self._window_start
+        if elapsed < self.RATE_WINDOW:
+            return
+        rate = self._window_bytes / elapsed
+        if self._measured_rate is None:
+            self._measured_rate = rate
+        else:
+            self._measured_rate += self.EWMA_WEIGHT * (rate - self._measured_rate)
+        self._window_start = now
+        self._window_bytes = 0
+
+
+def apply_io_priority(priority: str) -> bool:
+    """Lower this process's I/O priority, like ionice; returns True if applied
+
+    priority is "normal", "low" (best-effort, lowest level) or "idle".
+    """
+    if priority not in ("low", "idle"):
+        return False
+
+    if sys.platform.startswith("linux") and shutil.which("ionice"):
+        args = ["-c", "3"] if priority == "idle" else ["-c", "2", "-n", "7"]
+        try:
+            subprocess.run(
+                ["ionice", *args, "-p", str(os.getpid())],
+                check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            return True
+        except (OSError, subprocess.CalledProcessError):
+            pass
+
+    # Fall back to CPU niceness, which also lowers I/O priority on many systems
+    if hasattr(os, "nice"):
+        try:
+            os.nice(19 if priority == "idle" else 10)
+            return True
+        except OSError:
+            return False
+    return False
+
+
+_shared_throttles: Dict[str, Throttle] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_throttle(settings: Optional[Dict]) -> Optional[Throttle]:
+    """Get the process-wide Throttle for the given settings, or None if unset
+
+    Callers with identical settings share one instance so the limits apply
+    across all move workers in the process.
+    """
+    if not settings:
+        return None
+    key = json.dumps(settings, sort_keys=True)
+    with _shared_lock:
+        throttle = _shared_throttles.get(key)
+        if throttle is None:
+            throttle = Throttle.from_config(settings)
+            _shared_throttles[key] = throttle
+        return throttle
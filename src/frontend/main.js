@@ -10,6 +10,8 @@ document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('cleanupBtn').addEventListener('click', executeCleanup);
     document.getElementById('configBtn').addEventListener('click', openConfig);
     document.getElementById('logsBtn').addEventListener('click', openLogs);
+    document.getElementById('historyRange').addEventListener('change', loadHistory);
+    loadHistory();
 });
 
 // Scan Desktop
@@ -138,6 +140,7 @@ async function executeCleanup() {
             document.getElementById('failedFiles').textContent = summary.failed;
             
             showToast(`Cleanup complete! Moved ${summary.moved} files.`, 'success');
+            loadHistory();
             
             // Clear file list
             scannedFiles = [];
@@ -154,6 +157,77 @@ async function executeCleanup() {
     }
 }
 
+// Usage History
+async function loadHistory() {
+    const [granularity, days] = document.getElementById('historyRange').value.split(':');
+    
+    try {
+        const response = await fetch(`${API_BASE}/stats/history?granularity=${granularity}&days=${days}`);
+        const data = await response.json();
+        
+        if (data.success) {
+            displayHistory(data.series, data.totals);
+        } else {
+            // History is disabled in the configuration
+            document.getElementById('historyPanel').classList.add('hidden');
+        }
+    } catch (error) {
+        document.getElementById('historyPanel').classList.add('hidden');
+    }
+}
+
+function displayHistory(series, totals) {
+    const chart = document.getElementById('historyChart');
+    
+    if (series.length === 0) {
+        chart.innerHTML = '<p class="empty-state">No cleanups recorded in this period yet.</p>';
+    } else {
+        const maxFiles = Math.max(...series.map(entry => entry.files), 1);
+        let html = '';
+        
+        series.forEach(entry => {
+            // One column per period, stacked by category
+            let segments = '';
+            for (const [category, usage] of Object.entries(entry.categories)) {
+                const height = (usage.files / maxFiles * 100).toFixed(1);
+                segments += `<div class="history-segment category-bar-fill ${getCategoryClass(category)}" 
+                                  style="height: ${height}%"></div>`;
+            }
+            html += `
+                <div class="history-column" 
+                     title="${entry.period}: ${entry.files} files, ${formatBytes(entry.bytes)}">
+                    ${segments}
+                </div>
+            `;
+        });
+        
+        chart.innerHTML = html;
+    }
+    
+    const historyCategories = document.getElementById('historyCategories');
+    let html = '<div class="category-bars">';
+    
+    for (const [category, usage] of Object.entries(totals.categories)) {
+        const percentage = (usage.files / totals.files * 100).toFixed(1);
+        html += `
+            <div class="category-bar-item">
+                <div class="category-bar-label">
+                    <span class="${getCategoryClass(category)}">${category}</span>
+                    <span>${usage.files} files, ${formatBytes(usage.bytes)} (${percentage}%)</span>
+                </div>
+                <div class="category-bar-bg">
+                    <div class="category-bar-fill ${getCategoryClass(category)}" 
+                         style="width: ${percentage}%"></div>
+                </div>
+            </div>
+        `;
+    }
+    
+    html += '</div>';
+    historyCategories.innerHTML = html;
+    document.getElementById('historyPanel').classList.remove('hidden');
+}
+
 // Configuration
 async function openConfig() {
     showLoading('Loading configuration...');
@@ -274,6 +348,17 @@ function getFileIcon(extension) {
     return '📄';
 }
 
+function formatBytes(bytes) {
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let value = bytes;
+    let unit = 0;
+    while (value >= 1024 && unit < units.length - 1) {
+        value /= 1024;
+        unit++;
+    }
+    return `${value.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+}
+
 function showLoading(text = 'Loading...') {
     document.getElementById('loadingText').textContent = text;
     document.getElementById('loadingOverlay').classList.remove('hidden');
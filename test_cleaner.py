@@ -3,14 +3,7 @@ import os
 import sys
 from pathlib import Path
 
-# Add backend to path
-sys.path.insert(0, str(Path(__file__).parent / "src" / "backend"))
-
-from config_manager import ConfigManager
-from scanner import Scanner
-from categorizer import Categorizer
-from mover import Mover
-from logger import Logger
+from src.backend import ConfigManager, Scanner, Categorizer, Mover, Logger
 
 
 def create_test_files():
@@ -104,6 +97,1182 @@ def test_config():
     print(f"✓ System files: {len(config.get_system_files())}")
 
 
+def test_lazy_backend_imports():
+    """Test that backend submodules load only on first use"""
+    print("\n=== Testing Lazy Imports ===")
+    import subprocess
+    
+    code = (
+        "import sys; from src import backend; "
+        "loaded = [m for m in sys.modules if m.startswith('src.backend.')]; "
+        "backend.Scanner; "
+        "print(len(loaded), 'src.backend.scanner' in sys.modules, 'src.backend.mover' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=str(Path(__file__).parent), capture_output=True, text=True, check=True
+    ).stdout.split()
+    
+    assert output == ["0", "True", "False"], output
+    print("✓ Only requested modules were imported")
+
+
+def test_categorizer_cache():
+    """Test that categorizers with the same mapping share a compiled table"""
+    print("\n=== Testing Categorizer Cache ===")
+    categories = {"Documents": [".PDF", ".txt"], "Images": [".jpg"]}
+    
+    first = Categorizer(categories)
+    second = Categorizer({"Documents": [".PDF", ".txt"], "Images": [".jpg"]})
+    
+    assert first.extension_map is second.extension_map
+    assert second.categorize_file("/tmp/report.pdf") == "Documents"
+    assert second.categorize_file("/tmp/archive.zip") == "Others"
+    print("✓ Compiled extension table reused")
+
+
+def write_test_config(base_dir, filenames=()):
+    """Create a desktop with the given files and a config pointing at it"""
+    import json
+    desktop = Path(base_dir) / "desktop"
+    desktop.mkdir(exist_ok=True)
+    for filename in filenames:
+        (desktop / filename).write_text(f"Test content for {filename}")
+    
+    config_path = Path(base_dir) / "config.json"
+    config = dict(ConfigManager.DEFAULT_CONFIG)
+    config.update({
+        "desktop_path": str(desktop),
+        "target_base_path": str(Path(base_dir) / "Organized"),
+        "log_file": str(Path(base_dir) / "Organized" / "cleanup_log.txt")
+    })
+    config_path.write_text(json.dumps(config))
+    return str(config_path)
+
+
+def test_api_job_isolation():
+    """Test that concurrent cleanups keep separate summaries"""
+    print("\n=== Testing API Job Isolation ===")
+    try:
+        from src.api.app import create_app
+    except ImportError:
+        print("⚠ Flask not installed - skipping")
+        return
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        names = [f"file{i}.txt" for i in range(20)]
+        app = create_app(write_test_config(tmp, names))
+        desktop = Path(tmp) / "desktop"
+        
+        def cleanup(batch):
+            client = app.test_client()
+            files = [{"path": str(desktop / n), "category": "Documents"} for n in batch]
+            return client.post("/api/cleanup", json={"files": files}).get_json()
+        
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(cleanup, [names[i::4] for i in range(4)]))
+        
+        client = app.test_client()
+        for response in responses:
+            assert response["summary"]["moved"] == 5
+            job = client.get(f"/api/stats?job_id={response['job_id']}").get_json()
+            assert job["stats"]["moved"] == 5 and job["job"]["status"] == "completed"
+        
+        assert client.get("/api/stats").get_json()["stats"]["moved"] == 5
+        assert client.get("/api/stats?job_id=missing").status_code == 404
+    print("✓ Each cleanup job reported its own summary")
+
+
+def test_api_concurrent_load():
+    """Load test /api/scan and /api/stats on the threaded WSGI server"""
+    print("\n=== Testing API Concurrent Load ===")
+    try:
+        from src.api.app import create_app
+        from src.api.server import make_threaded_server
+    except ImportError:
+        print("⚠ Flask not installed - skipping")
+        return
+    import tempfile
+    import threading
+    import time
+    import urllib.request
+    from concurrent.futures import ThreadPoolExecutor
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(write_test_config(tmp, [f"doc{i}.pdf" for i in range(50)]))
+        server = make_threaded_server(app, "127.0.0.1", 0, threads=8)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        
+        def fetch(path):
+            with urllib.request.urlopen(base_url + path, timeout=10) as response:
+                return response.status
+        
+        try:
+            for path, count in (("/api/scan", 200), ("/api/stats", 400)):
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=16) as pool:
+                    statuses = list(pool.map(fetch, [path] * count))
+                elapsed = time.perf_counter() - start
+                
+                assert statuses == [200] * count
+                print(f"✓ {path}: {count} requests, 16 clients, {count / elapsed:.0f} req/s")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+def call_asgi(app, method, path, body=b"", query=b""):
+    """Call an ASGI app directly and return the messages it sent"""
+    import asyncio
+    
+    async def run():
+        request = [{"type": "http.request", "body": body, "more_body": False}]
+        messages = []
+        
+        async def receive():
+            return request.pop() if request else {"type": "http.disconnect"}
+        
+        async def send(message):
+            messages.append(message)
+        
+        scope = {"type": "http", "method": method, "path": path, "query_string": query}
+        await app(scope, receive, send)
+        return messages
+    
+    return asyncio.run(run())
+
+
+def test_asgi_streaming_scan():
+    """Test NDJSON streaming scan and cleanup through the ASGI app"""
+    print("\n=== Testing ASGI Streaming API ===")
+    import asyncio
+    import json
+    import tempfile
+    from src.api.asgi import create_asgi_app
+    
+    def records(messages):
+        body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+        return [json.loads(line) for line in body.splitlines()]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        names = [f"photo{i}.jpg" for i in range(150)] + ["notes.txt"]
+        app = create_asgi_app(write_test_config(tmp, names), max_workers=2)
+        app.service.batch_size = 16
+        app.service.queue_size = 2
+        
+        async def scan_many(clients):
+            async def one_client(delay):
+                messages = []
+                async def receive():
+                    return {"type": "http.disconnect"}
+                async def send(message):
+                    messages.append(message)
+                    await asyncio.sleep(delay)
+                scope = {"type": "http", "method": "GET", "path": "/api/scan", "query_string": b""}
+                await app(scope, receive, send)
+                return messages
+            # One slow reader must not stall the other clients
+            return await asyncio.gather(*(one_client(0.001 if i == 0 else 0) for i in range(clients)))
+        
+        results = asyncio.run(scan_many(20))
+        for messages in results:
+            lines = records(messages)
+            assert len(lines) == 152
+            assert lines[-1] == {"type": "summary", "total": 151,
+                                 "categories": {"Images": 150, "Documents": 1},
+                                 "similar_images": []}
+            # Streamed in chunks rather than one buffered body
+            assert sum(1 for m in messages if m["type"] == "http.response.body") > 2
+        print(f"✓ {len(results)} concurrent clients streamed 151 files each")
+        
+        files = [{"path": line["path"], "category": line["category"]} for line in records(results[0])[:-1]]
+        # The index may be rebuilt when opened, so it must not open on the event loop
+        import threading
+        get_index = app.service._get_index
+        index_threads = []
+        def record_thread(config_manager):
+            index_threads.append(threading.current_thread())
+            return get_index(config_manager)
+        app.service._get_index = record_thread
+        lines = records(call_asgi(app, "POST", "/api/cleanup", json.dumps({"files": files}).encode()))
+        assert index_threads and threading.main_thread() not in index_threads
+        summary = lines[-1]
+        assert summary["type"] == "summary" and summary["summary"]["moved"] == 151
+        assert all(line["status"] == "success" for line in lines[:-1])
+        
+        stats = records(call_asgi(app, "GET", "/api/stats", query=f"job_id={summary['job_id']}".encode()))
+        assert stats[0]["job"]["status"] == "completed"
+        print("✓ Cleanup streamed per-file results and recorded the job")
+        app.service.close()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_asgi_app(write_test_config(tmp, [f"photo{i}.jpg" for i in range(150)]), max_workers=2)
+        app.service.batch_size = 16
+        app.service.queue_size = 2
+        
+        async def stalled_scans_then_search():
+            stall = asyncio.Event()
+            async def stalled_client():
+                async def receive():
+                    return {"type": "http.disconnect"}
+                async def send(message):
+                    if message["type"] == "http.response.body":
+                        await stall.wait()
+                scope = {"type": "http", "method": "GET", "path": "/api/scan", "query_string": b""}
+                await app(scope, receive, send)
+            scans = [asyncio.ensure_future(stalled_client()) for _ in range(3)]
+            await asyncio.sleep(0.2)
+            
+            messages = []
+            async def receive():
+                return {"type": "http.disconnect"}
+            async def send(message):
+                messages.append(message)
+            scope = {"type": "http", "method": "GET", "path": "/api/search", "query_string": b"q=photo1"}
+            await asyncio.wait_for(app(scope, receive, send), 5)
+            for scan in scans:
+                scan.cancel()
+            await asyncio.gather(*scans, return_exceptions=True)
+            return messages
+        
+        # Every job slot is held by a client that stopped reading
+        messages = asyncio.run(stalled_scans_then_search())
+        assert messages[0]["status"] in (200, 400), messages
+        print("✓ /api/search answered while stalled scans held every job slot")
+        
+        async def first_items():
+            import threading
+            release = threading.Event()
+            def slow_source():
+                yield from range(3)
+                release.wait(5)
+                yield 3
+            received = []
+            start = asyncio.get_running_loop().time()
+            async for item in app.service.stream(slow_source):
+                received.append((item, asyncio.get_running_loop().time() - start))
+                release.set()
+            return received
+        
+        # A partial batch is delivered without waiting for batch_size items
+        received = asyncio.run(first_items())
+        assert [item for item, _ in received] == [0, 1, 2, 3] and received[2][1] < 1.0, received
+        print(f"✓ Partial batch flushed after {received[2][1] * 1000:.0f} ms")
+        
+        async def disconnecting_cleanup():
+            desktop = Path(tmp) / "desktop"
+            files = [{"path": str(desktop / f"photo{i}.jpg"), "category": "Images"} for i in range(150)]
+            body = json.dumps({"files": files}).encode()
+            request = [{"type": "http.request", "body": body, "more_body": False}]
+            sent = []
+            async def receive():
+                return request.pop() if request else {"type": "http.disconnect"}
+            async def send(message):
+                if len(sent) >= 3:
+                    raise OSError("Client disconnected")
+                sent.append(message)
+            scope = {"type": "http", "method": "POST", "path": "/api/cleanup", "query_string": b""}
+            try:
+                await app(scope, receive, send)
+            except OSError:
+                pass
+        
+        # Files moved before the client went away are still logged
+        asyncio.run(disconnecting_cleanup())
+        moved = 150 - len(list((Path(tmp) / "desktop").iterdir()))
+        log = (Path(tmp) / "Organized" / "cleanup_log.txt").read_text(encoding="utf-8")
+        assert 0 < moved < 150 and log.count("SUCCESS") == moved, (moved, log.count("SUCCESS"))
+        jobs = app.service.jobs
+        assert jobs.get_job(jobs._last_finished)["status"] == "failed"
+        print(f"✓ Aborted cleanup logged all {moved} moved files")
+        app.service.close()
+
+
+def test_throttle_limits():
+    """Test token bucket rate limits, schedules and adaptive backoff"""
+    print("\n=== Testing Throttle ===")
+    import errno
+    import tempfile
+    import time
+    from datetime import datetime
+    from unittest import mock
+    from src.backend.throttle import Throttle, ThrottleSchedule
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "big.bin"
+        source.write_bytes(os.urandom(3 * 1024 * 1024))
+        
+        # First second of budget is a burst, the last MiB waits ~0.5 s
+        throttle = Throttle(bytes_per_sec=2 * 1024 * 1024, max_concurrent_copies=1)
+        mover = Mover(throttle)
+        cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+        start = time.perf_counter()
+        with mock.patch("src.backend.mover.os.rename", side_effect=cross_device):
+            success, destination, error = mover.move_file(str(source), "Others", tmp)
+        elapsed = time.perf_counter() - start
+        
+        assert success, error
+        assert not source.exists() and Path(destination).stat().st_size == 3 * 1024 * 1024
+        assert 0.4 < elapsed < 2.0, elapsed
+        print(f"✓ 3 MiB cross-device copy at 2 MiB/s took {elapsed:.2f}s")
+        
+        names = [f"f{i}.txt" for i in range(60)]
+        for name in names:
+            (Path(tmp) / name).write_text(name)
+        mover = Mover(Throttle(files_per_sec=50))
+        start = time.perf_counter()
+        for name in names:
+            assert mover.move_file(str(Path(tmp) / name), "Documents", tmp)[0]
+        elapsed = time.perf_counter() - start
+        assert elapsed > 0.15, elapsed
+        print(f"✓ 60 files at 50 files/s took {elapsed:.2f}s")
+    
+    schedule = ThrottleSchedule([{"start": "22:00", "end": "06:00", "bytes_per_sec": 0}])
+    assert schedule.limits_at(datetime(2024, 1, 1, 23, 30)) is not None
+    assert schedule.limits_at(datetime(2024, 1, 1, 5, 59)) is not None
+    assert schedule.limits_at(datetime(2024, 1, 1, 12, 0)) is None
+    print("✓ Overnight schedule window matched")
+    
+    mb = 1024 * 1024
+    throttle = Throttle(bytes_per_sec=1000, adaptive=True)
+    for _ in range(5):
+        throttle.record_latency(0.01, mb)
+    for _ in range(5):
+        throttle.record_latency(0.5, mb)
+    assert throttle.scale < 0.5 and throttle.bytes_bucket.rate < 500
+    for _ in range(100):
+        throttle.record_latency(0.01, mb)
+    assert throttle.scale == 1.0
+    print("✓ Adaptive rate backed off under latency and recovered")
+    
+    # Healthy traffic must not back off: fast renames are not samples, and
+    # latency is judged per megabyte whatever the file size
+    with tempfile.TemporaryDirectory() as tmp:
+        throttle = Throttle(bytes_per_sec=1000, adaptive=True)
+        for i in range(5):
+            (Path(tmp) / f"r{i}.txt").write_text("x")
+            assert Mover(throttle).move_file(str(Path(tmp) / f"r{i}.txt"), "Documents", tmp)[0]
+    for _ in range(50):
+        throttle.record_latency(0.5, mb)
+    assert throttle.scale == 1.0
+    for i in range(500):
+        # Small files cost mostly overhead; large ones copy at a steady rate
+        throttle.record_latency(0.002, 4096)
+        throttle.record_latency(0.5 * (1 + 0.3 * (i % 3)), mb)
+        throttle.record_latency(0.15, 300 * 1024)
+    assert throttle.scale == 1.0
+    print("✓ Renames and a steady mix of small and large copies did not back off")
+    
+    # A lasting slowdown backs off, then becomes the new baseline
+    for _ in range(10):
+        throttle.record_latency(2.0, mb)
+    assert throttle.scale < 0.5
+    for _ in range(300):
+        throttle.record_latency(2.0, mb)
+    assert throttle.scale == 1.0
+    print("✓ Baseline adjusted to a lasting change in latency")
+    
+    # Without bytes_per_sec, backing off limits the throughput measured at full speed
+    clock = [0.0]
+    with mock.patch("src.backend.throttle.time.monotonic", lambda: clock[0]):
+        throttle = Throttle(adaptive=True)
+        for _ in range(300):
+            clock[0] += 0.01
+            throttle.record_latency(0.01, mb)
+        assert throttle.bytes_bucket.rate == 0
+        for _ in range(5):
+            clock[0] += 0.5
+            throttle.record_latency(0.5, mb)
+        assert throttle.scale < 0.5
+        assert 0 < throttle.bytes_bucket.rate < 50 * mb
+        for _ in range(100):
+            clock[0] += 0.01
+            throttle.record_latency(0.01, mb)
+        assert throttle.scale == 1.0 and throttle.bytes_bucket.rate == 0
+    print("✓ Adaptive rate without a configured limit backed off from measured throughput")
+
+
+def test_verified_copy():
+    """Test streaming checksums, destination verification and the log entry"""
+    print("\n=== Testing Verified Copies ===")
+    import errno
+    import hashlib
+    import tempfile
+    from unittest import mock
+    from src.backend.mover import ChecksumMismatchError
+    
+    cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+    with tempfile.TemporaryDirectory() as tmp:
+        data = os.urandom(2 * 1024 * 1024 + 123)
+        source = Path(tmp) / "video.mp4"
+        source.write_bytes(data)
+        
+        mover = Mover(settings={"checksum": "sha256", "verify": True})
+        with mock.patch("src.backend.mover.os.rename", side_effect=cross_device):
+            success, destination, error = mover.move_file(str(source), "Videos", tmp)
+        assert success, error
+        
+        checksum = mover.pop_checksum(destination)
+        assert checksum == "sha256:" + hashlib.sha256(data).hexdigest()
+        assert mover.pop_checksum(destination) == ""
+        
+        logger = Logger()
+        logger.log_success(str(source), destination, "Videos", checksum)
+        log_path = Path(tmp) / "log.txt"
+        logger.write_to_file(str(log_path))
+        assert f"Checksum: {checksum}" in log_path.read_text(encoding="utf-8")
+        print("✓ Digest computed during copy and written to the log")
+        
+        try:
+            mover.verify_copy(destination, "0" * 64)
+            assert False, "mismatch not detected"
+        except ChecksumMismatchError:
+            pass
+        
+        source.write_bytes(data)
+        with mock.patch("src.backend.mover.os.rename", side_effect=cross_device), \
+                mock.patch.object(Mover, "verify_copy", side_effect=ChecksumMismatchError("corrupt")):
+            success, destination, error = mover.move_file(str(source), "Others", tmp)
+        assert not success and error.startswith("Verification failed")
+        assert source.exists() and not (Path(tmp) / "Others" / "video.mp4").exists()
+        print("✓ Failed verification keeps the source and removes the copy")
+        
+        # verify without a reported checksum still re-reads the copy
+        unhashed = Mover(settings={"checksum": "none", "verify": True})
+        target = Path(tmp) / "copy.mp4"
+        assert unhashed.copy_file(str(source), str(target)) == ""
+        with mock.patch.object(Mover, "verify_copy", side_effect=ChecksumMismatchError("corrupt")):
+            try:
+                unhashed.copy_file(str(source), str(target))
+                assert False, "verification skipped"
+            except ChecksumMismatchError:
+                pass
+        assert not target.exists()
+        print("✓ Copies verified with sha256 when checksum is none")
+
+
+def test_verified_copy_benchmark():
+    """Benchmark unverified, streaming-checksum and re-read verified copies"""
+    print("\n=== Benchmarking Verified Copies ===")
+    import tempfile
+    import time
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        size = 64 * 1024 * 1024
+        source = Path(tmp) / "source.bin"
+        source.write_bytes(os.urandom(size))
+        
+        modes = [
+            ("unverified", {"checksum": "none"}),
+            ("streaming sha256", {"checksum": "sha256"}),
+            ("sha256 + re-read", {"checksum": "sha256", "verify": True}),
+        ]
+        for label, settings in modes:
+            target = Path(tmp) / "target.bin"
+            mover = Mover(settings=settings)
+            start = time.perf_counter()
+            digest = mover.copy_file(str(source), str(target))
+            elapsed = time.perf_counter() - start
+            target.unlink()
+            assert bool(digest) == (settings["checksum"] != "none")
+            print(f"✓ {label}: {size / elapsed / 1024 / 1024:.0f} MiB/s")
+
+
+def test_large_file_resume():
+    """Test resumable .partial copies of large files after an interruption"""
+    print("\n=== Testing Large File Resume ===")
+    import errno
+    import hashlib
+    import json
+    import tempfile
+    from unittest import mock
+    from src.backend.throttle import Throttle
+    
+    class InterruptingThrottle(Throttle):
+        """Counts copied bytes and fails once a limit is reached"""
+        def __init__(self, fail_after=None):
+            super().__init__()
+            self.copied = 0
+            self.fail_after = fail_after
+        
+        def acquire_bytes(self, amount):
+            if self.fail_after is not None and self.copied >= self.fail_after:
+                raise OSError(errno.EIO, "Network share disconnected")
+            self.copied += amount
+            return 0.0
+    
+    cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+    settings = {"large_file_threshold_mb": 1, "checkpoint_mb": 1}
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch("src.backend.mover.os.rename", side_effect=cross_device):
+        data = os.urandom(5 * 1024 * 1024 + 17)
+        source = Path(tmp) / "movie.mkv"
+        source.write_bytes(data)
+        target = Path(tmp) / "Videos" / "movie.mkv"
+        partial = Path(str(target) + ".partial")
+        checkpoint = Path(str(partial) + ".json")
+        
+        mover = Mover(InterruptingThrottle(fail_after=3 * 1024 * 1024 + 1), settings)
+        mover.CHUNK_SIZE = 256 * 1024
+        success, _, error = mover.move_file(str(source), "Videos", tmp)
+        assert not success and "disconnected" in error
+        assert source.exists() and partial.exists() and not target.exists()
+        saved_offset = json.loads(checkpoint.read_text())["offset"]
+        assert saved_offset == 3 * 1024 * 1024
+        print(f"✓ Interrupted copy kept a checkpoint at {saved_offset // 1024 // 1024} MiB")
+        
+        throttle = InterruptingThrottle()
+        mover = Mover(throttle, settings)
+        success, destination, error = mover.move_file(str(source), "Videos", tmp)
+        assert success, error
+        assert destination == str(target) and target.read_bytes() == data
+        assert throttle.copied == len(data) - saved_offset
+        assert mover.pop_checksum(destination) == "sha256:" + hashlib.sha256(data).hexdigest()
+        assert not source.exists() and not partial.exists() and not checkpoint.exists()
+        print("✓ Resumed copy transferred only the remaining bytes")
+        
+        # A corrupted partial file is detected and copied again from the start
+        source.write_bytes(data)
+        mover = Mover(InterruptingThrottle(fail_after=2 * 1024 * 1024), settings)
+        mover.move_file(str(source), "Others", tmp)
+        partial = Path(tmp) / "Others" / "movie.mkv.partial"
+        with open(partial, "r+b") as f:
+            f.write(b"corrupt")
+        throttle = InterruptingThrottle()
+        success, destination, error = Mover(throttle, settings).move_file(str(source), "Others", tmp)
+        assert success and throttle.copied == len(data)
+        assert Path(destination).read_bytes() == data
+        print("✓ Corrupted partial copy restarted from the beginning")
+
+
+def test_large_file_lane():
+    """Test that small files keep moving while a large file copies"""
+    print("\n=== Testing Large File Lane ===")
+    import errno
+    import tempfile
+    import time
+    from unittest import mock
+    from src.backend.throttle import Throttle
+    
+    class SlowLink(Throttle):
+        """Simulates a link that takes 0.2 s per MiB"""
+        def acquire_bytes(self, amount):
+            time.sleep(0.2 * amount / (1024 * 1024))
+            return 0.0
+    
+    cross_device = OSError(errno.EXDEV, "Invalid cross-device link")
+    with tempfile.TemporaryDirectory() as tmp, \
+            mock.patch("src.backend.mover.os.rename", side_effect=cross_device):
+        desktop = Path(tmp) / "desktop"
+        desktop.mkdir()
+        (desktop / "huge.mp4").write_bytes(os.urandom(4 * 1024 * 1024))
+        items = [(str(desktop / "huge.mp4"), "Videos")]
+        for i in range(20):
+            (desktop / f"note{i}.txt").write_text("small")
+            items.append((str(desktop / f"note{i}.txt"), "Documents"))
+        
+        mover = Mover(SlowLink(), {"large_file_threshold_mb": 1, "workers": 4})
+        order = [Path(result[0]).name for result in mover.move_files(items, str(Path(tmp) / "Organized"))]
+        
+        assert len(order) == 21 and order[-1] == "huge.mp4"
+        assert not any(desktop.iterdir())
+        print("✓ 20 small files finished while the large file was still copying")
+
+
+def test_metadata_index():
+    """Test indexing on move, search filters, rebuild and the search API"""
+    print("\n=== Testing Metadata Index ===")
+    import tempfile
+    from src.backend.index import MetadataIndex, shared_index
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        names = ["annual_report.pdf", "Report-Q3.docx", "beach.jpg", "song.mp3"]
+        config_path = write_test_config(tmp, names)
+        config = ConfigManager(config_path)
+        config.load_config()
+        desktop = config.get_desktop_path()
+        target_base = config.get_target_base_path()
+        categorizer = Categorizer(config.get_categories())
+        
+        index = shared_index(config.get_index_file(), target_base)
+        mover = Mover(index=index)
+        items = [(str(Path(desktop) / n), categorizer.categorize_file(n)) for n in names]
+        assert all(result[2] for result in mover.move_files(items, target_base))
+        assert index.count() == 4
+        
+        assert {r["name"] for r in index.search("rep")} == {"annual_report.pdf", "Report-Q3.docx"}
+        assert [r["name"] for r in index.search(extension="jpg")] == ["beach.jpg"]
+        assert [r["name"] for r in index.search("report", category="Documents", extension=".pdf")] == ["annual_report.pdf"]
+        assert index.search(source=desktop)[0]["source"].startswith(desktop)
+        assert index.search(min_size=10 ** 6) == []
+        assert len(index.search(after="2000-01-01", before="2999-01-01")) == 4
+        print("✓ Moved files indexed and found by name, category, extension, size, date and source")
+        
+        rebuilt = MetadataIndex(str(Path(tmp) / "rebuilt.sqlite3"))
+        assert rebuilt.rebuild(target_base) == 4
+        assert [r["name"] for r in rebuilt.search("song")] == ["song.mp3"]
+        print("✓ Index rebuilt from disk")
+        
+        # Rebuilding in place drops deleted files but keeps original sources
+        (Path(target_base) / "Audio" / "song.mp3").unlink()
+        assert index.rebuild(target_base) == 3
+        assert index.count() == 3 and index.search("song") == []
+        assert len(index.search(source=desktop)) == 3
+        print("✓ Rebuild pruned deleted files and kept source paths")
+        
+        # Queries with nothing to match are rejected; LIKE wildcards match literally
+        if index.has_fts:
+            try:
+                index.search('""')
+                assert False, "quote-only query should be rejected"
+            except ValueError:
+                pass
+        has_fts, index.has_fts = index.has_fts, False
+        assert [r["name"] for r in index.search("_")] == ["annual_report.pdf"]
+        assert index.search("%") == []
+        index.has_fts = has_fts
+        print("✓ Empty and wildcard queries handled")
+        
+        try:
+            from src.api.app import create_app
+        except ImportError:
+            print("⚠ Flask not installed - skipping API check")
+            return
+        client = create_app(config_path).test_client()
+        response = client.get("/api/search?q=beach&category=Images").get_json()
+        assert response["success"] and response["total"] == 1
+        assert client.get("/api/search?after=yesterday").status_code == 400
+        if index.has_fts:
+            assert client.get('/api/search?q=""').status_code == 400
+        print("✓ /api/search returned filtered results")
+
+
+def test_metadata_index_scale():
+    """Time searches over a large synthetic index"""
+    print("\n=== Benchmarking Metadata Index ===")
+    import random
+    import tempfile
+    import time
+    from src.backend.index import MetadataIndex
+    
+    count = 200_000
+    categories = ["Documents", "Images", "Videos", "Audio", "Archives", "Code"]
+    words = ["report", "invoice", "holiday", "scan", "draft", "budget", "photo", "backup"]
+    rng = random.Random(42)
+    now = time.time()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index = MetadataIndex(str(Path(tmp) / "index.sqlite3"))
+        records = []
+        for i in range(count):
+            name = f"{rng.choice(words)}_{rng.choice(words)}_{i}.{rng.choice(['pdf', 'jpg', 'mp4', 'zip'])}"
+            category = rng.choice(categories)
+            records.append((f"/organized/{category}/{name}", name, category, "." + name.rsplit(".", 1)[1],
+                            rng.randint(1, 10 ** 9), now - rng.randint(0, 10 ** 8), f"/desktop/{name}", now))
+        start = time.perf_counter()
+        index.add_many(records, bulk=True)
+        print(f"✓ Indexed {count} files in {time.perf_counter() - start:.2f}s")
+        
+        queries = [
+            {"query": "invoice budget", "limit": 50},
+            {"query": "hol", "category": "Images"},
+            {"extension": "pdf", "min_size": 5 * 10 ** 8},
+            {"category": "Videos", "after": "2025-01-01"},
+            {"source": "/desktop/report_scan"},
+        ]
+        for params in queries:
+            start = time.perf_counter()
+            results = index.search(**params)
+            elapsed = (time.perf_counter() - start) * 1000
+            assert results and elapsed < 500, (params, elapsed)
+            print(f"✓ {params}: {len(results)} results in {elapsed:.1f} ms")
+
+
+def write_png(path, width, height, pixel):
+    """Write an RGB PNG, cycling through all five scanline filter types"""
+    import struct
+    import zlib
+    
+    def paeth(a, b, c):
+        p = a + b - c
+        pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+        return a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+    
+    raw = b""
+    prev = [0] * (width * 3)
+    for y in range(height):
+        line = [channel for x in range(width) for channel in pixel(x, y)]
+        filter_type = y % 5
+        out = []
+        for i, value in enumerate(line):
+            left = line[i - 3] if i >= 3 else 0
+            up_left = prev[i - 3] if i >= 3 else 0
+            predictor = [0, left, prev[i], (left + prev[i]) // 2, paeth(left, prev[i], up_left)][filter_type]
+            out.append((value - predictor) & 0xFF)
+        raw += bytes([filter_type] + out)
+        prev = line
+    
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    
+    Path(path).write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def test_similar_images():
+    """Test PNG/BMP decoding, perceptual hashing, BK-tree lookup and grouping"""
+    print("\n=== Testing Similar Images ===")
+    import math
+    import random
+    import struct
+    import tempfile
+    import zlib
+    from src.backend import perceptual
+    
+    def scene(width, height, shift=0):
+        def pixel(x, y):
+            u, v = x / width, y / height
+            value = int(128 + 90 * math.sin(u * 9) * math.cos(v * 7)) + shift
+            value = max(0, min(255, value))
+            return (value, value // 2, 255 - value)
+        return pixel
+    
+    def other_scene(x, y):
+        value = 255 if (x // 6 + y // 6) % 2 else 0
+        return (value, value, value)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        write_png(Path(tmp) / "sunset.png", 96, 80, scene(96, 80))
+        write_png(Path(tmp) / "sunset_small.png", 45, 37, scene(45, 37))
+        write_png(Path(tmp) / "sunset_bright.png", 96, 80, scene(96, 80, shift=25))
+        write_png(Path(tmp) / "chess.png", 64, 64, other_scene)
+        
+        # Same scene as a bottom-up 24-bit BMP
+        width, height = 60, 50
+        stride = (width * 3 + 3) & ~3
+        rows = b""
+        for y in reversed(range(height)):
+            row = b"".join(bytes(reversed(scene(width, height)(x, y))) for x in range(width))
+            rows += row + b"\0" * (stride - len(row))
+        header = struct.pack("<2sIHHI", b"BM", 54 + len(rows), 0, 0, 54)
+        info = struct.pack("<IiiHHIIiiII", 40, width, height, 1, 24, 0, len(rows), 0, 0, 0, 0)
+        (Path(tmp) / "sunset.bmp").write_bytes(header + info + rows)
+        (Path(tmp) / "broken.png").write_bytes(b"\x89PNG\r\n\x1a\nnot really")
+        
+        # Malformed files that parse far enough to reach the pixel data
+        def png(color_type, width, height, raw, extra=b""):
+            def chunk(kind, data):
+                return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+            return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))
+                    + extra + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+        (Path(tmp) / "bad_palette.png").write_bytes(
+            png(3, 4, 2, b"\0\0\1\7\3" * 2, extra=struct.pack(">I", 3) + b"PLTE" + b"\xff\0\0" + b"\0" * 4))
+        (Path(tmp) / "short_idat.png").write_bytes(png(2, 16, 40, b"\0" + b"\x80" * 48))
+        (Path(tmp) / "cut.png").write_bytes((Path(tmp) / "sunset.png").read_bytes()[:400])
+        (Path(tmp) / "cut.bmp").write_bytes((header + info + rows)[:600])
+        for name in ["bad_palette.png", "short_idat.png", "cut.png", "cut.bmp"]:
+            assert perceptual.load_thumbnail(str(Path(tmp) / name)) is None, name
+        print("✓ Malformed PNG and BMP files skipped")
+        
+        # A tiny image whose pixel data inflates to 64 MB is rejected without inflating it
+        import tracemalloc
+        bomb = png(2, 10, 10, bytes(64 * 1024 * 1024))
+        tracemalloc.start()
+        assert perceptual.decode_png(bomb) is None
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert peak < 1024 * 1024, peak
+        print(f"✓ {len(bomb) // 1024} KB decompression bomb rejected (peak {peak // 1024} KB)")
+        
+        decoded = perceptual.decode_png((Path(tmp) / "sunset_small.png").read_bytes())
+        expected = [(299 * r + 587 * g + 114 * b) // 1000
+                    for y in range(37) for x in range(45) for r, g, b in [scene(45, 37)(x, y)]]
+        assert decoded == (45, 37, expected)
+        print("✓ Pure-Python PNG decoder reversed all filter types")
+        
+        data = (Path(tmp) / "sunset_small.png").read_bytes()
+        assert perceptual.decode_png(data, max_pixels=45 * 37) and not perceptual.decode_png(data, max_pixels=1000)
+        print("✓ Images over the pixel cap skipped before decoding")
+        
+        paths = [str(p) for p in sorted(Path(tmp).iterdir())]
+        hashes = perceptual.hash_images(paths, workers=2, batch_size=2)
+        assert str(Path(tmp) / "broken.png") not in hashes and len(hashes) == 5, sorted(hashes)
+        # Later calls reuse the spawned pool instead of forking a new one
+        pool = perceptual._pools[2]
+        assert perceptual.hash_images(paths, workers=2, batch_size=2) == hashes and perceptual._pools[2] is pool
+        
+        groups = perceptual.group_similar(hashes, max_distance=6)
+        names = [[Path(p).name for p in group] for group in groups]
+        assert names == [["sunset.bmp", "sunset.png", "sunset_bright.png", "sunset_small.png"]], names
+        print("✓ Resized, brightened and re-encoded copies grouped; other image left out")
+    
+    rng = random.Random(7)
+    values = [rng.getrandbits(64) for _ in range(2000)]
+    tree = perceptual.BKTree()
+    for i, value in enumerate(values):
+        tree.add(value, i)
+    probe = values[0] ^ 0b1011
+    found = sorted(i for _, i in tree.search(probe, 12))
+    brute = sorted(i for i, v in enumerate(values) if perceptual.hamming_distance(v, probe) <= 12)
+    assert found == brute and 0 in found
+    print("✓ BK-tree search matched brute force")
+
+
+def test_similar_images_api():
+    """Test near-duplicate groups in /api/scan"""
+    print("\n=== Testing Similar Images API ===")
+    try:
+        from src.api.app import create_app
+    except ImportError:
+        print("⚠ Flask not installed - skipping")
+        return
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        client = create_app(write_test_config(tmp)).test_client()
+        desktop = Path(tmp) / "desktop"
+        gradient = lambda w: (lambda x, y: (x * 255 // w, y * 3, 128))
+        write_png(desktop / "a.png", 40, 40, gradient(40))
+        write_png(desktop / "a_copy.png", 80, 80, gradient(80))
+        
+        assert client.get("/api/scan").get_json()["similar_images"] == []
+        groups = client.get("/api/scan?similar=1").get_json()["similar_images"]
+        assert [sorted(Path(p).name for p in g["files"]) for g in groups] == [["a.png", "a_copy.png"]]
+    print("✓ /api/scan?similar=1 returned the near-duplicate group")
+
+
+def test_usage_history():
+    """Test hourly, daily and monthly rollups, compaction and reloading"""
+    print("\n=== Testing Usage History ===")
+    import tempfile
+    import time
+    from datetime import datetime, timedelta
+    from src.backend.analytics import UsageHistory
+    
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    operations = []
+    for hours_ago in range(0, 450 * 24, 6):
+        stamp = (now - timedelta(hours=hours_ago)).strftime("%Y-%m-%d %H:%M:%S")
+        operations.append({"timestamp": stamp, "status": "success", "category": "Images",
+                           "destination": "/organized/Images/photo.JPG", "size": 1000})
+        operations.append({"timestamp": stamp, "status": "success", "category": "Documents",
+                           "destination": "/organized/Documents/notes.txt", "size": 10})
+    operations.append({"timestamp": now.strftime("%Y-%m-%d %H:%M:%S"), "status": "failed",
+                       "source": "/desktop/locked.txt", "destination": "", "error": "in use"})
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "usage_history.jsonl")
+        history = UsageHistory(path)
+        assert history.record_run(operations, {"moved": len(operations) - 1, "failed": 1}) == 1800
+        
+        months = history.history("month")
+        total = history.totals(months)
+        assert total["files"] == 3600 and total["bytes"] == 1800 * 1010 and total["failed"] == 1
+        assert total["extensions"][".jpg"] == {"files": 1800, "bytes": 1800 * 1000}
+        assert total["categories"]["Documents"]["files"] == 1800
+        print(f"✓ {len(months)} months hold every file and byte")
+        
+        days = history.history("day")
+        assert len(days) <= 401 and days[-2]["files"] == 8
+        hours = history.history("hour")
+        oldest_hour = datetime.strptime(hours[0]["period"], "%Y-%m-%d %H")
+        assert now - oldest_hour <= timedelta(days=31)
+        with open(path, encoding="utf-8") as f:
+            assert len(f.readlines()) - 1 == len(hours)
+        assert [h["period"] for h in history.history("hour", days=1)][-1] == now.strftime("%Y-%m-%d %H")
+        print(f"✓ Old hours compacted: log keeps {len(hours)} hours, rollup keeps {len(days)} days")
+        
+        # Another process (a second instance) appends; both see the new run
+        other = UsageHistory(path)
+        stamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        other.record_run([{"timestamp": stamp, "status": "success", "category": "Audio",
+                           "destination": "/organized/Audio/song.mp3", "size": 5}], {"moved": 1})
+        today = history.history("day", since=now.strftime("%Y-%m-%d"))
+        assert today[0]["categories"]["Audio"] == {"files": 1, "bytes": 5}
+        assert history.last_run() == {"moved": 1}
+        
+        reloaded = UsageHistory(path)
+        start = time.perf_counter()
+        year = reloaded.history("day", days=365)
+        elapsed = (time.perf_counter() - start) * 1000
+        assert reloaded.history("month") == history.history("month")
+        assert elapsed < 500, elapsed
+        print(f"✓ Reloaded history; a year of daily rollups queried in {elapsed:.1f} ms ({len(year)} days)")
+    
+    # The CLI and the web server record into the same files from different
+    # processes; compaction on one must not drop the other's appends
+    from concurrent.futures import ThreadPoolExecutor
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "usage_history.jsonl")
+        writers = [UsageHistory(path, hourly_retention_days=1) for _ in range(2)]
+        stamp = (now - timedelta(days=5)).strftime("%Y-%m-%d %H:%M:%S")
+        run = [{"timestamp": stamp, "status": "success", "category": "Images",
+                "destination": "/organized/Images/photo.png", "size": 1}]
+        
+        def record(history):
+            for _ in range(30):
+                history.record_run(run, {"moved": 1})
+        
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            list(pool.map(record, writers))
+        assert UsageHistory(path).totals(UsageHistory(path).history("month"))["files"] == 60
+    print("✓ Concurrent writers with compaction lost no runs")
+
+
+def test_usage_history_api():
+    """Test /api/stats/history and /api/stats after a restart"""
+    print("\n=== Testing Usage History API ===")
+    try:
+        from src.api.app import create_app
+    except ImportError:
+        print("⚠ Flask not installed - skipping")
+        return
+    import json
+    import tempfile
+    from src.api.asgi import create_asgi_app
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        names = ["a.txt", "b.txt", "c.png"]
+        config_path = write_test_config(tmp, names)
+        desktop = Path(tmp) / "desktop"
+        files = [{"path": str(desktop / n), "category": "Images" if n.endswith(".png") else "Documents"}
+                 for n in names]
+        create_app(config_path).test_client().post("/api/cleanup", json={"files": files})
+        
+        # A fresh app has no jobs in memory, so stats come from the history
+        client = create_app(config_path).test_client()
+        assert client.get("/api/stats").get_json()["stats"]["moved"] == 3
+        response = client.get("/api/stats/history?granularity=hour&days=1").get_json()
+        assert response["success"] and response["totals"]["files"] == 3
+        assert response["totals"]["categories"]["Documents"]["bytes"] == (desktop.parent / "Organized" / "Documents" / "a.txt").stat().st_size * 2
+        assert client.get("/api/stats/history?granularity=week").status_code == 400
+        print("✓ /api/stats/history returned persisted rollups")
+        
+        messages = call_asgi(create_asgi_app(config_path), "GET", "/api/stats/history", query=b"granularity=month")
+        body = json.loads(messages[-1]["body"])
+        assert body["success"] and body["series"][-1]["extensions"][".png"]["files"] == 1
+    print("✓ ASGI /api/stats/history matched")
+
+    # A history that cannot be written must not fail a cleanup that already ran
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = write_test_config(tmp, ["d.txt"])
+        blocker = Path(tmp) / "not_a_dir"
+        blocker.write_text("")
+        config = json.loads(Path(config_path).read_text())
+        config["history_file"] = str(blocker / "usage_history.jsonl")
+        Path(config_path).write_text(json.dumps(config))
+
+        files = [{"path": str(Path(tmp) / "desktop" / "d.txt"), "category": "Documents"}]
+        response = create_app(config_path).test_client().post("/api/cleanup", json={"files": files})
+        body = response.get_json()
+        assert response.status_code == 200 and body["success"], body
+        assert body["summary"]["moved"] == 1 and "usage history" in body["warning"]
+        assert (Path(tmp) / "Organized" / "Documents" / "d.txt").exists()
+
+        (Path(tmp) / "desktop" / "e.txt").write_text("e")
+        files = [{"path": str(Path(tmp) / "desktop" / "e.txt"), "category": "Documents"}]
+        messages = call_asgi(create_asgi_app(config_path), "POST", "/api/cleanup", json.dumps({"files": files}).encode())
+        lines = [json.loads(line) for m in messages if m.get("body") for line in m["body"].decode().splitlines()]
+        assert lines[-1]["type"] == "summary" and "usage history" in lines[-1]["warning"], lines
+    print("✓ Unwritable history reported as a warning; cleanups still succeeded")
+
+
+def test_slow_filesystem():
+    """Test Mover error paths, cross-device copies and resumes on a fake slow filesystem"""
+    print("\n=== Testing Slow Filesystem ===")
+    import errno
+    import hashlib
+    import time
+    from unittest import mock
+    from src.backend.fs import MemoryFileSystem, SlowFileSystem, file_in_use_error
+    
+    fs = SlowFileSystem(MemoryFileSystem(devices=["/nas"]), delays={"read": 0.001, "write": 0.001})
+    for name in ["report.pdf", "locked.pdf", "busy.pdf", "notes.txt"]:
+        fs.add_file(f"/desktop/{name}", name.encode() * 1000)
+    fs.fail("/desktop/locked.pdf")
+    fs.fail("/desktop/busy.pdf", file_in_use_error, times=1)
+    
+    # /nas is another device, so every move is a checksummed, verified copy
+    mover = Mover(settings={"verify": True}, fs=fs)
+    items = [(f"/desktop/{name}", "Documents") for name in ["report.pdf", "locked.pdf", "busy.pdf", "notes.txt"]]
+    results = {Path(r[0]).name: r for r in mover.move_files(items, "/nas/Organized")}
+    assert results["report.pdf"][2] and results["notes.txt"][2]
+    assert results["locked.pdf"][4].startswith("Permission denied")
+    assert results["busy.pdf"][4].startswith("File in use by another process")
+    data = fs.read_bytes("/nas/Organized/Documents/report.pdf")
+    assert data == b"report.pdf" * 1000 and not fs.exists("/desktop/report.pdf")
+    assert mover.pop_checksum(results["report.pdf"][3]) == "sha256:" + hashlib.sha256(data).hexdigest()
+    assert sorted(fs.listdir("/desktop")) == ["busy.pdf", "locked.pdf"]
+    print("✓ Permission and file-in-use errors reported; other files copied and verified")
+    
+    # The copy is flushed to disk before the source is deleted
+    fs.add_file("/desktop/draft.pdf", b"draft" * 1000)
+    fs.fail("/nas/Organized/Documents/draft.pdf", lambda p: OSError(errno.EIO, "Input/output error", p),
+            ops=("fsync",), times=1)
+    fsyncs = fs.calls["fsync"]
+    assert not Mover(settings={"verify": True}, fs=fs).move_file("/desktop/draft.pdf", "Documents", "/nas/Organized")[0]
+    assert fs.exists("/desktop/draft.pdf") and not fs.exists("/nas/Organized/Documents/draft.pdf")
+    assert Mover(fs=fs).move_file("/desktop/draft.pdf", "Documents", "/nas/Organized")[0]
+    assert fs.calls["fsync"] - fsyncs == 2
+    print("✓ Copies fsynced before the source is removed")
+    
+    # The lock was transient, so the next run picks the file up
+    assert Mover(fs=fs).move_file("/desktop/busy.pdf", "Documents", "/nas/Organized")[0]
+    print("✓ File moved once it was no longer in use")
+    
+    # Break a large copy part way through, then resume it
+    fs.add_file("/desktop/movie.mkv", bytes(range(256)) * 40000)
+    settings = {"large_file_threshold_mb": 1, "checkpoint_mb": 2}
+    fs.fail("/nas/Organized/Videos/movie.mkv.partial", lambda p: OSError(errno.EIO, "Connection lost", p),
+            ops=("write",), times=1, after=5)
+    success, _, error = Mover(settings=settings, fs=fs).move_file("/desktop/movie.mkv", "Videos", "/nas/Organized")
+    assert not success and "Connection lost" in error
+    assert fs.exists("/nas/Organized/Videos/movie.mkv.partial.json")
+    writes = fs.calls["write"]
+    assert Mover(settings=settings, fs=fs).move_file("/desktop/movie.mkv", "Videos", "/nas/Organized")[0]
+    # Counting checkpoint saves, a fresh copy takes 15 writes; resuming from 4 MB takes 8
+    assert fs.calls["write"] - writes <= 8
+    assert fs.read_bytes("/nas/Organized/Videos/movie.mkv") == bytes(range(256)) * 40000
+    print("✓ Interrupted large copy resumed from its checkpoint")
+    
+    # A copy started under a duplicate-suffixed name resumes under that name
+    # rather than leaving its partial behind and starting again
+    fs.add_file("/nas/Organized/Videos/trip.mkv", b"an older trip")
+    fs.add_file("/desktop/trip.mkv", bytes(range(256)) * 40000)
+    fs.fail("/nas/Organized/Videos/trip_*.mkv.partial", lambda p: OSError(errno.EIO, "Connection lost", p),
+            ops=("write",), times=1, after=5)
+    with mock.patch.object(Mover, "generate_timestamp_suffix", return_value="first"):
+        assert not Mover(settings=settings, fs=fs).move_file("/desktop/trip.mkv", "Videos", "/nas/Organized")[0]
+    writes = fs.calls["write"]
+    with mock.patch.object(Mover, "generate_timestamp_suffix", return_value="second"):
+        success, destination, _ = Mover(settings=settings, fs=fs).move_file("/desktop/trip.mkv", "Videos", "/nas/Organized")
+    assert success and destination == "/nas/Organized/Videos/trip_first.mkv"
+    assert fs.calls["write"] - writes <= 8
+    assert not [name for name in fs.listdir("/nas/Organized/Videos") if ".partial" in name]
+    print("✓ Copy under a duplicate-suffixed name resumed without orphaning its partial")
+    
+    # Partials whose source is gone are cleaned up; other files are left alone
+    fs.add_file("/nas/Organized/Archives/old.zip.partial", b"x" * 100)
+    fs.add_file("/nas/Organized/Archives/old.zip.partial.json", b'{"source": "/desktop/old.zip", "offset": 0}')
+    fs.add_file("/nas/Organized/Archives/mine.partial", b"not ours")
+    fs.add_file("/desktop/new.zip", b"zip" * 1000)
+    # Looked for when a large file is moved into the folder
+    assert Mover(settings={"large_file_threshold_mb": 0.001}, fs=fs).move_file("/desktop/new.zip", "Archives", "/nas/Organized")[0]
+    assert sorted(fs.listdir("/nas/Organized/Archives")) == ["mine.partial", "new.zip"]
+    print("✓ Stale partial copies removed")
+    
+    # Small files never have partials, so their moves do not list the folder
+    for i in range(5):
+        fs.add_file(f"/desktop/memo{i}.txt", b"memo")
+    scans = fs.calls["scandir"]
+    items = [(f"/desktop/memo{i}.txt", "Documents") for i in range(5)]
+    assert all(r[2] for r in Mover(fs=fs).move_files(items, "/nas/Organized"))
+    assert fs.calls["scandir"] == scans
+    print("✓ Small moves skipped the partial-copy lookup")
+    
+    # The final segment is flushed to disk before the source is removed
+    fs.add_file("/desktop/clip.mkv", bytes(range(256)) * 8000)
+    fs.fail("/nas/Organized/Videos/clip.mkv.partial", lambda p: OSError(errno.EIO, "Input/output error", p),
+            ops=("fsync",), times=1)
+    large = {"large_file_threshold_mb": 1, "checkpoint_mb": 64}
+    assert not Mover(settings=large, fs=fs).move_file("/desktop/clip.mkv", "Videos", "/nas/Organized")[0]
+    assert fs.exists("/desktop/clip.mkv") and not fs.exists("/nas/Organized/Videos/clip.mkv")
+    assert Mover(settings=large, fs=fs).move_file("/desktop/clip.mkv", "Videos", "/nas/Organized")[0]
+    print("✓ Large copies fsynced before the source is removed")
+    
+    # Per-file lane selection (stat) and duplicate checks (exists) must not
+    # serialize on slow storage
+    slow_stat = SlowFileSystem(MemoryFileSystem(), delays={"stat": 0.002, "exists": 0.002})
+    for i in range(2000):
+        slow_stat.add_file(f"/desktop/file{i}.txt", b"x")
+    items = [(f"/desktop/file{i}.txt", "Documents") for i in range(2000)]
+    start = time.perf_counter()
+    moved = sum(r[2] for r in Mover(settings={"workers": 16}, fs=slow_stat).move_files(items, "/organized"))
+    elapsed = time.perf_counter() - start
+    assert moved == 2000 and elapsed < 2000 * 0.002, elapsed
+    print(f"✓ 2000 moves with 2 ms stat/exists calls took {elapsed:.2f}s (serially: over 8s)")
+
+    # A consumer that stops early must not leave unlogged moves behind
+    slow_rename = SlowFileSystem(MemoryFileSystem(), delays={"rename": 0.01})
+    for i in range(40):
+        slow_rename.add_file(f"/desktop/file{i}.txt", b"x")
+    items = [(f"/desktop/file{i}.txt", "Documents") for i in range(40)]
+    abandoned = []
+    moves = Mover(settings={"workers": 4}, fs=slow_rename).move_files(
+        items, "/organized", on_abandoned=lambda *result: abandoned.append(result))
+    reported = next(moves)
+    moves.close()
+    left = slow_rename.listdir("/desktop")
+    assert Path(reported[0]).name not in left
+    # Moves that finished but were never yielded are handed to on_abandoned
+    assert len(abandoned) == 40 - 1 - len(left) and all(result[2] for result in abandoned)
+    # Only moves already picked up by the 4 workers by the time the consumer
+    # stopped may finish; before the fix all 40 were moved
+    assert len(left) >= 40 - 2 * 4, len(left)
+    print(f"✓ Closing the move stream early left {len(left)} of 39 unreported files in place")
+
+
+def test_slow_filesystem_scale():
+    """Scan and move 100k files in parallel on a fake NAS with injected failures"""
+    print("\n=== Benchmarking Slow Filesystem (100k files) ===")
+    import time
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+    from src.backend.fs import MemoryFileSystem, SlowFileSystem, file_in_use_error
+    
+    count = 100_000
+    extensions = [".pdf", ".jpg", ".mp3", ".zip", ".py", ".xyz"]
+    memory = MemoryFileSystem()
+    for i in range(count):
+        memory.add_file(f"/desktop/file_{i}{extensions[i % 6]}", b"x")
+    for name in ["desktop.ini", ".hidden", "Thumbs.db"]:
+        memory.add_file(f"/desktop/{name}")
+    memory.makedirs("/desktop/folder")
+    # Some names are already taken in the organized folder
+    for i in range(0, 600, 6):
+        memory.add_file(f"/organized/Documents/file_{i}.pdf")
+    
+    fs = SlowFileSystem(memory, delays={"scandir": 1.0, "rename": 0.0005, "stat": 0.0002})
+    fs.fail("/desktop/file_*7.jpg")
+    fs.fail("/desktop/file_*1.zip", file_in_use_error)
+    
+    scanner = Scanner(fs=fs)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        scans = list(pool.map(lambda _: scanner.scan_desktop("/desktop"), range(4)))
+    elapsed = time.perf_counter() - start
+    assert all(len(files) == count for files in scans)
+    # Listing latency overlaps; serialized, the listings alone would take 4s
+    assert elapsed < 4.5, elapsed
+    print(f"✓ 4 concurrent scans of {count} files in {elapsed:.2f}s (1s listing latency each)")
+    
+    categorizer = Categorizer(ConfigManager.DEFAULT_CONFIG["categories"])
+    items = [(path, categorizer.categorize_file(path)) for path in scans[0]]
+    mover = Mover(settings={"workers": 32}, fs=fs)
+    start = time.perf_counter()
+    results = list(mover.move_files(items, "/organized"))
+    elapsed = time.perf_counter() - start
+    
+    errors = Counter(r[4].split(":")[0] for r in results if not r[2])
+    denied = sum(1 for i in range(count) if i % 6 == 1 and i % 10 == 7)
+    in_use = sum(1 for i in range(count) if i % 6 == 3 and i % 10 == 1)
+    assert errors == {"Permission denied": denied, "File in use by another process": in_use}, errors
+    destinations = [r[3] for r in results if r[2]]
+    assert len(destinations) == len(set(destinations)) == count - denied - in_use
+    assert len(fs.listdir("/desktop")) == denied + in_use + 4
+    assert len(fs.listdir("/organized/Documents")) == len(range(0, count, 6)) + 100
+    print(f"✓ Moved {len(destinations)} files in {elapsed:.2f}s with 32 workers "
+          f"({denied} permission errors, {in_use} files in use)")
+
+
 def cleanup_test_files():
     """Remove test files"""
     import shutil
@@ -125,6 +1294,24 @@ def main():
         files = test_scanner()
         test_categorizer(files)
         test_logger()
+        test_lazy_backend_imports()
+        test_categorizer_cache()
+        test_api_job_isolation()
+        test_api_concurrent_load()
+        test_asgi_streaming_scan()
+        test_throttle_limits()
+        test_verified_copy()
+        test_verified_copy_benchmark()
+        test_large_file_resume()
+        test_large_file_lane()
+        test_metadata_index()
+        test_metadata_index_scale()
+        test_similar_images()
+        test_similar_images_api()
+        test_usage_history()
+        test_usage_history_api()
+        test_slow_filesystem()
+        test_slow_filesystem_scale()
         
         print("\n" + "="*60)
         print("✅ All tests passed!")